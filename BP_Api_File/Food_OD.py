@@ -1,6 +1,6 @@
 # 
-import requests
 import os
+import sys
 import json
 # kt-api lib
 from datetime import datetime
@@ -13,14 +13,14 @@ import time
 #yolov8
 from ultralytics import YOLO
 # from django.core.exceptions import ImproperlyConfigured
+# 서버와 같은 keep-alive http client 사용
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+from api_client import KT_FOOD_URL, kt_client, clova_client
+from config import load_config
 
 def get_secret(setting, secrets_file):
-    try:
-        with open(secret_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[setting]
-    except KeyError:
-        error_msg = "Set the {} environment variable".format(setting)
+    # 설정 파일은 처음 한 번만 읽고 이후에는 메모리에서 조회
+    return load_config(secrets_file)[setting]
 
 # pillow 사용 이미지 사이즈 조절 - 수정 요망
 # ===============================================================
@@ -56,7 +56,7 @@ def food_api(img_path,secret_file):
     ).hexdigest()
 
     # api서버 연결 및 api 사용 준비
-    url = "https://aiapi.genielabs.ai/kt/vision/food"
+    url = KT_FOOD_URL
     client_key = get_secret("kt_client_key",secret_file)
     signature = signature
     timestamp = timestamp
@@ -76,11 +76,12 @@ def food_api(img_path,secret_file):
     img_size_pillow(img_path)
     #------------------------------------------------
 
-    img = open(img_path, "rb")
+    with open(img_path, "rb") as f:
+        img = f.read()
 
     obj =  {'metadata': json.dumps(fields), 'media': img} # or "false"
 
-    response = requests.post(url, headers=headers, files=obj)
+    response = kt_client.post(url, headers=headers, files=obj)
 
     if response.ok:
         json_data = json.loads(response.text)
@@ -138,14 +139,15 @@ def OCR_api(img_path,secret_file):
     }
 
     payload = {'message': json.dumps(request_json).encode('UTF-8')}
-    files = [
-    ('file', open(img_path,'rb'))
-    ]
+    with open(img_path,'rb') as f:
+        files = [
+        ('file', f.read())
+        ]
     headers = {
     'X-OCR-SECRET': secret_key
     }
 
-    response = requests.request("POST", api_url, headers=headers, data = payload, files = files)
+    response = clova_client.post(api_url, headers=headers, data = payload, files = files)
 
     # print(response.text.encode('utf8'))
 
@@ -0,0 +1,167 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from metrics import stage_seconds, external_api_errors_total, external_api_retries_total
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+
+# KT / Clova api 호출용 keep-alive 세션 풀
+# 서버(model_api.py)와 BP_Api_File/Food_OD.py 가 함께 사용
+#
+# 환경 변수로 설정 (클라이언트별 값이 없으면 공통 값 사용)
+#   BP_HTTP_POOL_CONNECTIONS / BP_KT_POOL_CONNECTIONS / BP_CLOVA_POOL_CONNECTIONS
+#   BP_HTTP_POOL_MAXSIZE, BP_HTTP_CONNECT_TIMEOUT, BP_HTTP_READ_TIMEOUT,
+#   BP_HTTP_MAX_RETRIES, BP_HTTP_BACKOFF_BASE, BP_HTTP_BACKOFF_MAX
+#   BP_HTTP_BREAKER_FAILURES : 연속 실패 횟수가 이 값이 되면 circuit open
+#   BP_HTTP_BREAKER_RESET    : open 후 시험 호출까지 기다리는 시간 (초)
+#   BP_HTTP_MAX_INFLIGHT     : 동시에 진행할 수 있는 호출 수 (넘으면 기다리지 않고 실패 - 느린 api 가 worker 를 모두 잡지 않도록)
+
+KT_FOOD_URL = "https://aiapi.genielabs.ai/kt/vision/food"
+
+HTTP_DEFAULTS = {
+    "pool_connections": 4,
+    "pool_maxsize": 16,
+    "connect_timeout": 3.05,
+    "read_timeout": 15.0,
+    "max_retries": 2,
+    "backoff_base": 0.2,
+    "backoff_max": 2.0,
+    "breaker_failures": 5,
+    "breaker_reset": 30.0,
+    "max_inflight": 8,
+}
+
+# 유료 api 이므로 요청이 처리되었을 수 있는 500 은 재시도하지 않음
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def _retryable_error(error):
+    # 요청을 보내기 전에 실패한 경우만 재시도 (연결 시간 초과 / DNS / 연결 거부)
+    # 응답 대기 시간 초과(ReadTimeout)나 보낸 뒤 끊긴 연결은 이미 처리(과금)되었을 수 있으므로 재시도하지 않음
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.Timeout) or not isinstance(error, requests.ConnectionError):
+        return False
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def _http_setting(name, key):
+    default = HTTP_DEFAULTS[key]
+    value = os.environ.get(f"BP_{name.upper()}_{key.upper()}", os.environ.get(f"BP_HTTP_{key.upper()}"))
+    if value is None:
+        return default
+    return type(default)(value)
+
+
+class BulkheadFullError(Exception):
+    pass
+
+
+class ApiClient:
+    def __init__(self, name, pool_connections=None, pool_maxsize=None, connect_timeout=None,
+                 read_timeout=None, max_retries=None, backoff_base=None, backoff_max=None):
+        self.name = name
+        self.pool_connections = pool_connections or _http_setting(name, "pool_connections")
+        self.pool_maxsize = pool_maxsize or _http_setting(name, "pool_maxsize")
+        self.connect_timeout = connect_timeout or _http_setting(name, "connect_timeout")
+        self.read_timeout = read_timeout or _http_setting(name, "read_timeout")
+        self.max_retries = _http_setting(name, "max_retries") if max_retries is None else max_retries
+        self.backoff_base = backoff_base or _http_setting(name, "backoff_base")
+        self.backoff_max = backoff_max or _http_setting(name, "backoff_max")
+        self.breaker = CircuitBreaker(name, _http_setting(name, "breaker_failures"), _http_setting(name, "breaker_reset"))
+        self._inflight = threading.BoundedSemaphore(_http_setting(name, "max_inflight"))
+
+        self.session = requests.Session()
+        # 재시도는 아래 post() 에서 직접 처리 (jitter backoff)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              max_retries=0, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt, deadline=None):
+        # full jitter : 0 ~ min(max, base * 2^attempt), 남은 시간이 부족하면 재시도하지 않음
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if deadline is not None and deadline.remaining() <= delay:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _timeout(self, deadline):
+        if deadline is None:
+            return (self.connect_timeout, self.read_timeout)
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self.name}: request deadline exceeded")
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    def post(self, url, deadline=None, **kwargs):
+        # files 로 넘기는 이미지는 재시도 시에도 다시 보낼 수 있도록 bytes 로 전달해야 함
+        # deadline(resilience.Deadline) 이 있으면 남은 시간 안에서만 호출 / 재시도
+        if not self._inflight.acquire(blocking=False):
+            external_api_errors_total.inc(api=self.name, kind="bulkhead_full")
+            raise BulkheadFullError(f"{self.name}: too many in-flight requests")
+        try:
+            if not self.breaker.allow():
+                external_api_errors_total.inc(api=self.name, kind="circuit_open")
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            ok = False
+            try:
+                response = self._post(url, deadline, kwargs)
+                # 429 / 5xx 응답도 장애로 판단
+                ok = response.status_code < 500 and response.status_code != 429
+                return response
+            except DeadlineExceeded:
+                # 호출하기 전에 요청 시간이 다 된 경우는 api 장애가 아님
+                ok = None
+                raise
+            finally:
+                if ok is None:
+                    self.breaker.release()
+                elif ok:
+                    self.breaker.success()
+                else:
+                    self.breaker.failure()
+        finally:
+            self._inflight.release()
+
+    def _post(self, url, deadline, kwargs):
+        # 재시도를 포함한 전체 왕복 시간 (kt_roundtrip / clova_roundtrip)
+        fixed_timeout = kwargs.pop("timeout", None)
+        with stage_seconds.time(stage=f"{self.name}_roundtrip"):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    timeout = fixed_timeout or self._timeout(deadline)
+                    response = self.session.post(url, timeout=timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as error:
+                    external_api_errors_total.inc(api=self.name, kind=type(error).__name__)
+                    if (not _retryable_error(error) or attempt >= self.max_retries
+                            or not self._backoff(attempt, deadline)):
+                        raise
+                    print(f"@api-client {self.name} retry {attempt + 1}:", error)
+                    external_api_retries_total.inc(api=self.name)
+                    continue
+                except DeadlineExceeded:
+                    external_api_errors_total.inc(api=self.name, kind="deadline")
+                    raise
+
+                if response.status_code >= 400:
+                    external_api_errors_total.inc(api=self.name, kind=str(response.status_code))
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    if not self._backoff(attempt, deadline):
+                        return response
+                    print(f"@api-client {self.name} retry {attempt + 1}: status {response.status_code}")
+                    external_api_retries_total.inc(api=self.name)
+                    response.close()
+                    continue
+                return response
+
+    def close(self):
+        self.session.close()
+
+
+kt_client = ApiClient("kt")
+clova_client = ApiClient("clova")
@@ -0,0 +1,271 @@
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 서버 hot path 마이크로 벤치마크 (오프라인 / CPU)
+#   - 외부 api(KT / Clova)는 고정 응답으로 대체
+#   - 작은 YOLO 가중치(yolov8n / yolov5nu 구조, 학습 안 됨)를 임시 폴더에 생성해서 사용
+#   - 결과를 baseline 과 비교하여 중앙값이 허용 범위를 넘으면 exit code 1
+#     (증가율이 --tolerance 를 넘고, 증가량이 --min-delta-ms 와 두 측정 stdev 의 2 배보다 큰 경우만 regression)
+#
+# 사용법 (Server 폴더에서)
+#   python bench/bench_hotpaths.py                      # 실행 후 bench/baseline.json 과 비교
+#   python bench/bench_hotpaths.py --save-baseline      # 현재 결과를 baseline 으로 저장
+#   python bench/bench_hotpaths.py --tolerance 0.5 --repeat 50
+#
+# baseline 의 시간은 측정한 기계에서만 의미가 있음
+#   -> CI 에서는 같은 기계에서 기준 commit 으로 --save-baseline 을 먼저 실행한 뒤 변경 commit 을 비교
+#      (저장소의 bench/baseline.json 은 참고용 - 1 코어 개발 VM 에서 측정)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+ROOT_DIR = os.path.dirname(SERVER_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+IMAGE_GLOBS = [
+    os.path.join(ROOT_DIR, "img_file", "*.jpg"),
+    os.path.join(ROOT_DIR, "BP_Api_File", "test_img", "*.jpg"),
+]
+
+# KT 응답 예시 (result_food_request_example 기반)
+KT_STUB_FOODS = ["연근조림", "홍어무침", "약식", "파김치", "코다리조림", "김치찌개"]
+
+
+def make_dummy_weights(work_dir):
+    # 주의 : ultralytics 는 import 시 PIL Image.open 을 바꿈 (열기 실패 시 pi-heif 로딩)
+    #        여기서 model_api 보다 먼저 import 되므로 upload.probe_image 는 import 순서와 상관없이 동작해야 함
+    #        (tests/test_upload.py 가 같은 순서로 확인)
+    from ultralytics import YOLO
+    weights = []
+    for cfg, name in (("yolov8n.yaml", "yolov8_dummy.pt"), ("yolov5nu.yaml", "yolov5u_dummy.pt")):
+        path = os.path.join(work_dir, name)
+        YOLO(cfg).save(path)
+        weights.append(path)
+    return weights
+
+
+def setup_environment(work_dir):
+    os.environ["BP_MODEL_WEIGHTS"] = ",".join(make_dummy_weights(work_dir))
+    os.environ["BP_SECRET_FILE"] = os.path.join(work_dir, "secrets.json")
+    for key in ("KT_CLIENT_ID", "KT_CLIENT_SECRET", "KT_CLIENT_KEY", "CLOVA_OCR_INVOKE_URL", "NAVER_SECRET_KEY"):
+        os.environ["BP_SECRET_" + key] = "bench"
+    os.environ["BP_CONFIG_RELOAD_INTERVAL"] = "0"
+    # 같은 이미지를 반복하므로 결과 캐시는 끔
+    os.environ["BP_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["BP_CACHE_DIR"] = ""
+    # 결과 로그 / 영양 정보 DB 는 임시 폴더에 기록 (상대 경로 기본값도 임시 폴더 안을 가리키도록 run 폴더에서 실행)
+    os.environ["BP_RESULT_LOG_DIR"] = os.path.join(work_dir, "result_logs")
+    os.environ["BP_NUTRITION_DB"] = os.path.join(work_dir, "nutrition.db")
+    run_dir = os.path.join(work_dir, "run")
+    os.makedirs(run_dir, exist_ok=True)
+    os.chdir(run_dir)
+    sys.path.insert(0, SERVER_DIR)
+
+
+def stub_external_apis(model_api):
+    import numpy as np
+
+    def ocr_stub(img, deadline=None):
+        return {"images": [{"inferResult": "ERROR", "message": "bench"}]}
+
+    def kt_stub(img, deadline=None):
+        rng = np.random.default_rng(len(img))
+        food_api_result = {}
+        point_list = []
+        for index, food_name in enumerate(KT_STUB_FOODS):
+            x, y = rng.integers(0, 900, 2)
+            confidence = float(rng.uniform(0.2, 0.9))
+            food_api_result[f"region_{index}"] = {"food_name": food_name, "confidence": confidence}
+            point_list.append([int(x), int(y), int(x + 200), int(y + 200), food_name, confidence])
+        return [food_api_result, point_list]
+
+    model_api.OCR_api = ocr_stub
+    model_api.food_api = kt_stub
+
+
+def synthetic_detections(names, boxes_per_model, models, width, height, seed=0):
+    # 반찬이 많은 식탁처럼 박스가 많은 경우를 가정한 모델 출력
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    detections = []
+    base = rng.uniform(0, [width * 0.8, height * 0.8], (boxes_per_model, 2))
+    size = rng.uniform(80, 300, (boxes_per_model, 2))
+    cls = rng.integers(0, len(names), boxes_per_model)
+    for _ in range(models):
+        jitter = rng.normal(0, 8, (boxes_per_model, 4))
+        xyxy = np.concatenate([base, base + size], axis=1) + jitter
+        detections.append({
+            "xyxy": xyxy.tolist(),
+            "conf": rng.uniform(0.1, 0.95, boxes_per_model).tolist(),
+            "cls": cls.tolist(),
+            "names": [names[c] for c in cls.tolist()],
+        })
+    return detections
+
+
+def measure(func, repeat, warmup=2):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # 메모리 할당은 tracemalloc 오버헤드가 있으므로 별도로 측정
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "stdev_ms": round(statistics.pstdev(timings), 3),
+        "peak_alloc_kb": round((peak - before) / 1024, 1),
+    }
+
+
+def run_benchmarks(repeat, filter_name=None):
+    import model_api
+    from image_context import ImageContext
+    stub_external_apis(model_api)
+    # 모델 로드 / warmup 이 끝난 뒤부터 측정
+    if not model_api.startup.wait(timeout=None):
+        raise SystemExit(f"startup failed: {model_api.startup.error}")
+
+    images = sorted(path for pattern in IMAGE_GLOBS for path in glob.glob(pattern))
+    image_bytes = [open(path, "rb").read() for path in images]
+    print(f"@bench images: {len(images)}, models: {[model.weight for model in model_api.model_list]}")
+
+    names = model_api.model_list[0].names
+    sample = ImageContext(image_bytes[0])
+    sample_width, sample_height = sample.resized.size
+    kt_result = model_api.food_api(sample.resized_bytes)
+    crowded = synthetic_detections(names, 60, len(model_api.model_list), sample_width, sample_height)
+    response = {
+        "inferResult": 1, "mealType": "", "dayTime": "",
+        "predict": {"foodNames": KT_STUB_FOODS * 3, "ktFoodsInfo": kt_result[0]},
+    }
+    client = model_api.app.test_client()
+
+    def img_resize_all():
+        for data in image_bytes:
+            model_api.img_resize(data)
+
+    def image_context_all():
+        for data in image_bytes:
+            image = ImageContext(data)
+            image.array
+            image.resized_bytes
+
+    def model_predict():
+        for model in model_api.model_list:
+            model.predict(sample.array)
+
+    def wbf_crowded():
+        model_api.get_prediction_wbf(sample, model_api.model_list, kt_result=kt_result, model_results=crowded)
+
+    def serialize_response():
+        json.dumps(response, ensure_ascii=False)
+
+    def predict_handler():
+        for data in image_bytes[:3]:
+            client.post("/predict", data={"food_image": (io.BytesIO(data), "bench.jpg")})
+
+    benchmarks = {
+        "img_resize[all images]": img_resize_all,
+        "image_context[all images]": image_context_all,
+        "model_predict[sample]": model_predict,
+        "get_prediction_wbf[crowded]": wbf_crowded,
+        "serialize_response": serialize_response,
+        "predict_handler[3 images]": predict_handler,
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        if filter_name and filter_name not in name:
+            continue
+        # 무거운 벤치마크는 반복 횟수를 줄임
+        count = max(3, repeat // 5) if name.startswith(("predict_handler", "model_predict", "img_resize", "image_context")) else repeat
+        results[name] = measure(func, count)
+        print(f"@bench {name}: {results[name]}")
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    # 아주 짧은 벤치마크의 증가율이나 측정 편차 안의 차이는 regression 으로 보지 않음
+    regressions = []
+    print(f"{'benchmark':32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:32} {'-':>10} {result['median_ms']:>10.3f} {'new':>8}")
+            continue
+        base = baseline[name]["median_ms"]
+        delta = result["median_ms"] - base
+        change = delta / base if base else 0.0
+        noise = 2 * max(baseline[name].get("stdev_ms", 0.0), result.get("stdev_ms", 0.0))
+        flag = ""
+        if change > tolerance:
+            if delta > max(min_delta_ms, noise):
+                flag = "  <-- REGRESSION"
+                regressions.append(name)
+            else:
+                flag = "  (within noise)"
+        print(f"{name:32} {base:>10.3f} {result['median_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BP server hot path benchmarks")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--filter", default=None, help="이름에 이 문자열이 포함된 벤치마크만 실행")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="중앙값 허용 증가율 (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="이 값(ms) 이하의 중앙값 증가는 무시")
+    parser.add_argument("--output", default=None, help="결과 json 저장 경로")
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory(prefix="bp-bench-") as work_dir:
+        setup_environment(work_dir)
+        results = run_benchmarks(args.repeat, args.filter)
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print("Baseline saved:", baseline_path)
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("No baseline found, run with --save-baseline first:", baseline_path)
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("Benchmark regressions:", ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import numpy as np
+from config import env_setting
+from metrics import Counter
+
+# 모델 cascade - 가장 빠른 모델을 먼저 실행하고 결과가 불확실할 때만 나머지 모델을 추가로 실행
+#   BP_CASCADE            : 1 이면 cascade 사용 (0 = 항상 모든 모델 실행)
+#   BP_CASCADE_LOW        : 이 값 미만의 박스는 무시 (WBF skip_box_thr 와 같은 기준)
+#   BP_CASCADE_HIGH       : LOW 이상 HIGH 미만의 박스가 있으면 불확실한 것으로 보고 escalation
+#   BP_CASCADE_KT_IOU     : KT 영역과 첫 모델 박스의 최소 IoU (겹치는 박스가 없는 KT 영역이 있으면 escalation)
+#   BP_CASCADE_EMPTY      : 첫 모델이 아무것도 찾지 못한 경우에도 escalation
+CASCADE = env_setting("BP_CASCADE", False)
+CASCADE_LOW = env_setting("BP_CASCADE_LOW", 0.20)
+CASCADE_HIGH = env_setting("BP_CASCADE_HIGH", 0.60)
+CASCADE_KT_IOU = env_setting("BP_CASCADE_KT_IOU", 0.30)
+CASCADE_EMPTY = env_setting("BP_CASCADE_EMPTY", True)
+
+cascade_total = Counter("bp_cascade_total", "Cascade decisions by outcome and reason", ("outcome", "reason"))
+
+
+def order_models(model_list):
+    # 측정된 추론 시간이 짧은 모델부터 (측정 전이면 설정 순서 유지)
+    return sorted(model_list, key=lambda model: float("inf") if model.latency is None else model.latency)
+
+
+def _max_iou(box, boxes):
+    xA = np.maximum(boxes[:, 0], box[0])
+    yA = np.maximum(boxes[:, 1], box[1])
+    xB = np.minimum(boxes[:, 2], box[2])
+    yB = np.minimum(boxes[:, 3], box[3])
+    inter = np.maximum(xB - xA, 0) * np.maximum(yB - yA, 0)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union = area + (box[2] - box[0]) * (box[3] - box[1]) - inter
+    return float(np.max(inter / np.maximum(union, 1e-9)))
+
+
+def escalation_reason(detection, kt_result):
+    # 첫 모델 결과(detect() 의 dict)와 KT 결과로 나머지 모델 실행 여부 판단 (None = 첫 모델 결과만 사용)
+    conf = np.asarray(detection["conf"], dtype=np.float64)
+    boxes = np.asarray(detection["xyxy"], dtype=np.float64).reshape(-1, 4)
+    kept = conf >= CASCADE_LOW
+    if np.any(kept & (conf < CASCADE_HIGH)):
+        return "uncertain"
+    point_list = kt_result[1] if kt_result else []
+    if not np.any(kept):
+        return "empty" if CASCADE_EMPTY and point_list else None
+    for item in point_list:
+        if _max_iou(np.asarray(item[:4], dtype=np.float64), boxes[kept]) < CASCADE_KT_IOU:
+            return "kt_disagree"
+    return None
+
+
+def record(reason):
+    cascade_total.inc(outcome="accepted" if reason is None else "escalated", reason=reason or "confident")
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+
+# api 키 설정 파일 (시작 시 한 번만 읽고 이후에는 메모리에서 조회)
+SECRET_FILE = os.environ.get("BP_SECRET_FILE", "secrets.json")
+
+# 서버 시작 시 반드시 있어야 하는 키
+REQUIRED_SECRETS = (
+    "kt_client_id",
+    "kt_client_secret",
+    "kt_client_key",
+    "CLOVA_OCR_Invoke_URL",
+    "naver_secret_key",
+)
+
+# 없어도 되는 설정 (환경 변수로도 지정 가능)
+#   kt_food_url : KT api 주소 변경 (mock_api.py 등 로컬 대체 서버 사용 시)
+OPTIONAL_SETTINGS = (
+    "kt_food_url",
+)
+
+# 환경 변수 override : BP_SECRET_<KEY 대문자>  (예: BP_SECRET_KT_CLIENT_ID)
+ENV_PREFIX = "BP_SECRET_"
+
+
+class ConfigError(Exception):
+    pass
+
+
+def env_setting(name, default):
+    # 환경 변수 값을 기본값과 같은 타입으로 변환
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() not in ("0", "false", "no", "off", "")
+    return type(default)(value)
+
+
+class Config:
+    def __init__(self, secret_file=SECRET_FILE, required=REQUIRED_SECRETS):
+        self.secret_file = secret_file
+        self.required = tuple(required)
+        self._values = {}
+        self._mtime = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.secret_file).st_mtime
+        except OSError:
+            return None
+
+    def _read(self):
+        values = {}
+        if os.path.exists(self.secret_file):
+            with open(self.secret_file, encoding="utf-8") as f:
+                values = json.load(f)
+
+        for key in set(values) | set(self.required) | set(OPTIONAL_SETTINGS):
+            env_value = os.environ.get(ENV_PREFIX + key.upper())
+            if env_value is not None:
+                values[key] = env_value
+
+        missing = [key for key in self.required if not values.get(key)]
+        if missing:
+            raise ConfigError(
+                "Missing settings {} (set them in {} or as {}<KEY> environment variables)".format(
+                    ", ".join(missing), self.secret_file, ENV_PREFIX
+                )
+            )
+        return values
+
+    def reload(self):
+        mtime = self._file_mtime()
+        values = self._read()
+        # dict 를 통째로 교체하므로 조회하는 요청 스레드는 lock 없이 읽어도 됨
+        self._values = values
+        self._mtime = mtime
+        return values
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def start_watch(self, interval=10.0):
+        # 키 교체(rotation)를 위해 파일 변경 시 다시 읽음
+        # fork 된 worker 에는 thread 가 없으므로 다시 호출하면 새로 시작
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="bp-config-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watch(self):
+        self._stop.set()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            mtime = self._file_mtime()
+            if mtime == self._mtime:
+                continue
+            try:
+                self.reload()
+                print("@config reloaded", self.secret_file)
+            except (OSError, ValueError, ConfigError) as error:
+                # 잘못된 파일로 바뀐 경우 기존 값을 유지
+                self._mtime = mtime
+                print("@config reload failed, keeping previous values:", error)
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def load_config(secret_file=SECRET_FILE, required=REQUIRED_SECRETS):
+    with _configs_lock:
+        if secret_file not in _configs:
+            _configs[secret_file] = Config(secret_file, required)
+        return _configs[secret_file]
@@ -0,0 +1,65 @@
+import gc
+import multiprocessing
+import os
+
+# 운영용 실행 설정 (개발용 app.run(debug=True) 대체)
+#   cd Server
+#   gunicorn -c gunicorn.conf.py model_api:app
+#
+# master 프로세스에서 모델을 한 번 로드 / warmup 한 뒤(preload_app) worker 를 fork
+# -> 모델 가중치 메모리는 copy-on-write 로 모든 worker 가 공유 (/models 의 process.pss_mb 로 확인)
+#
+#   BP_BIND              : 주소 (기본 0.0.0.0:5000)
+#   BP_WORKERS           : worker 프로세스 수 (기본 코어 수 / BP_TORCH_THREADS)
+#   BP_TORCH_THREADS     : worker 별 torch intra-op thread 수 (기본 1, workers x threads <= 코어 수 권장)
+#   BP_WORKER_THREADS    : worker 별 요청 처리 thread 수 (OCR / KT 대기 중 다른 요청 처리)
+#   BP_TIMEOUT           : 응답 없는 worker 를 재시작하기까지의 시간 (초)
+#   BP_GRACEFUL_TIMEOUT  : 종료(SIGTERM) 시 처리 중인 요청을 기다리는 시간 (초)
+#   BP_MAX_REQUESTS      : worker 재시작 주기 (0 = 사용 안 함)
+
+cores = multiprocessing.cpu_count()
+torch_threads = int(os.environ.get("BP_TORCH_THREADS", "1"))
+
+# torch 를 import 하기 전에 설정해야 master 의 thread pool 도 같은 크기로 만들어짐
+os.environ["BP_TORCH_THREADS"] = str(torch_threads)
+os.environ.setdefault("OMP_NUM_THREADS", str(torch_threads))
+os.environ.setdefault("MKL_NUM_THREADS", str(torch_threads))
+# fork 전에 모델 로드 / warmup 을 끝내야 함 (background thread 는 fork 된 worker 로 복사되지 않음)
+os.environ["BP_BACKGROUND_STARTUP"] = "0"
+
+bind = os.environ.get("BP_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("BP_WORKERS", max(1, cores // max(1, torch_threads))))
+worker_class = "gthread"
+threads = int(os.environ.get("BP_WORKER_THREADS", "4"))
+preload_app = True
+timeout = int(os.environ.get("BP_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("BP_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.environ.get("BP_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+
+def when_ready(server):
+    # preload 로 만든 객체를 gc 대상에서 제외 -> worker 에서 gc 가 공유 페이지를 건드려 복사되는 것을 방지
+    gc.freeze()
+    server.log.info("@gunicorn ready: %s workers x %s torch threads (%s cores)", workers, torch_threads, cores)
+
+
+def post_fork(server, worker):
+    import model_api
+    from model_registry import set_torch_threads
+    from startup import READY_WAIT_SEC
+    # master 에서 시작한 thread (설정 파일 감시 등) 는 worker 에 없으므로 다시 시작
+    set_torch_threads(torch_threads)
+    model_api.config.start_watch(model_api.env_setting("BP_CONFIG_RELOAD_INTERVAL", 10.0))
+    if not model_api.startup.wait(READY_WAIT_SEC):
+        server.log.error("@gunicorn worker %s started without ready models: %s", worker.pid, model_api.startup.error)
+
+
+def worker_exit(server, worker):
+    # 처리 중인 fan-out 작업과 남은 결과 로그를 마무리하고 종료
+    import model_api
+    model_api.executor.shutdown(wait=True, cancel_futures=True)
+    model_api.result_log.close()
+    model_api.nutrition_store.flush()
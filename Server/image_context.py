@@ -0,0 +1,172 @@
+import hashlib
+import io
+import threading
+import numpy as np
+from PIL import Image, ImageOps
+from config import env_setting
+from metrics import timed
+
+# EXIF orientation 태그 번호
+EXIF_ORIENTATION = 0x0112
+# 90도 / 270도 회전이 필요한 orientation 값 (가로 / 세로가 바뀜)
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# 원본이 목표 크기보다 이 배수 이상 크면 JPEG draft 모드(DCT 단계 축소)로 디코딩
+DRAFT_MIN_FACTOR = env_setting("BP_DRAFT_MIN_FACTOR", 2.0)
+# PIL resize 의 reducing_gap - 정수배 reduce() 후 나머지만 resampling
+REDUCING_GAP = env_setting("BP_REDUCING_GAP", 3.0)
+
+
+def resize_target(width, height):
+    # 최소 및 최대 크기 정의
+    minWidth, maxWidth = (720, 2560) if width > height else (720, 1440)
+    minHeight, maxHeight = (1080, 1440) if width > height else (1080, 2560)
+    if minWidth <= width <= maxWidth and minHeight <= height <= maxHeight:
+        # 크기 조정 필요 없음
+        return None
+
+    # 이미지 크기 조정
+    newWidth, newHeight = width, height
+    if width < minWidth or height < minHeight:
+        # 이미지 확대
+        if width / height > 1:
+            # 넓은 이미지
+            newHeight = max(height, minHeight)
+            newWidth = round(newHeight * (width / height))
+            if newWidth < minWidth:
+                newWidth = minWidth
+                newHeight = round(newWidth / (width / height))
+        else:
+            # 높은 이미지
+            newWidth = max(width, minWidth)
+            newHeight = round(newWidth / (width / height))
+            if newHeight < minHeight:
+                newHeight = minHeight
+                newWidth = round(newHeight * (width / height))
+    elif width > maxWidth or height > maxHeight:
+        # 이미지 축소
+        if width / height > 1:
+            # 넓은 이미지
+            newWidth = min(width, maxWidth)
+            newHeight = round(newWidth / (width / height))
+            if newHeight > maxHeight:
+                newHeight = maxHeight
+                newWidth = round(newHeight * (width / height))
+        else:
+            # 높은 이미지
+            newHeight = min(height, maxHeight)
+            newWidth = round(newHeight / (width / height))
+            if newWidth > maxWidth:
+                newWidth = maxWidth
+                newHeight = round(newWidth / (width / height))
+    return newWidth, newHeight
+
+
+class ImageContext:
+    # 업로드 이미지 한 장을 요청 전체에서 공유
+    # 원본 bytes, 한 번만 디코딩한 이미지, 필요할 때 만드는 파생 이미지(리사이즈 / JPEG / 모델 입력 배열)
+    def __init__(self, data):
+        self.data = data
+        self._lock = threading.RLock()
+        self._digest = None
+        # 요청별 단계 시간(ms) - result log 에 함께 기록
+        self.timings = {}
+        self._image = None
+        self._source_format = None
+        self._orientation = None
+        self._target = None
+        # 원본(회전 적용 후) 크기, 실제 디코딩된 크기, draft 디코딩 사용 여부
+        self.source_size = None
+        self.decoded_size = None
+        self.fast_path = False
+        self._resized = None
+        self._resized_bytes = None
+        self._array = None
+
+    @property
+    def digest(self):
+        # 업로드 bytes 의 sha256 - 결과 캐시 키
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def image(self):
+        with self._lock:
+            if self._image is None:
+                with timed("decode", record=self.timings):
+                    self._decode()
+            return self._image
+
+    def _decode(self):
+        with Image.open(io.BytesIO(self.data)) as img:
+            self._source_format = img.format
+            self._orientation = img.getexif().get(EXIF_ORIENTATION)
+            rotated = self._orientation in ROTATED_ORIENTATIONS
+            width, height = img.size
+            if rotated:
+                width, height = height, width
+            self.source_size = (width, height)
+            self._target = resize_target(width, height)
+
+            # 큰 JPEG 는 DCT 단계에서 1/2, 1/4, 1/8 로 줄여서 디코딩 (목표 크기 이상으로만 줄어듦)
+            if (img.format == "JPEG" and self._target is not None
+                    and min(width / self._target[0], height / self._target[1]) >= DRAFT_MIN_FACTOR):
+                draft_size = (self._target[1], self._target[0]) if rotated else self._target
+                raw_size = img.size
+                img.draft("RGB", draft_size)
+                self.fast_path = img.size != raw_size
+            img.load()
+
+            # EXIF 회전은 디코딩과 같은 단계에서 적용
+            if self._orientation not in (None, 1):
+                decoded = ImageOps.exif_transpose(img)
+            else:
+                decoded = img
+            self._image = decoded if decoded.mode == "RGB" else decoded.convert("RGB")
+        self.decoded_size = self._image.size
+
+    @property
+    def size(self):
+        # 원본 이미지 크기 (EXIF 회전 적용 후)
+        self.image
+        return self.source_size
+
+    @property
+    def resized(self):
+        with self._lock:
+            if self._resized is None:
+                image = self.image
+                target = self._target
+                if target is None:
+                    self._resized = image
+                else:
+                    print("@hello15 : Resized Image Size:", target[0], target[1])
+                    with timed("resize", record=self.timings):
+                        self._resized = image.resize(target, reducing_gap=REDUCING_GAP)
+            return self._resized
+
+    @property
+    def resized_bytes(self):
+        # 외부 api 로 보낼 때만 JPEG 인코딩
+        # 리사이즈가 필요 없는 JPEG 는 원본 bytes 를 그대로 사용 (회전 태그가 있는 경우 제외)
+        with self._lock:
+            if self._resized_bytes is None:
+                resized = self.resized
+                if (resized is self.image and self._source_format == "JPEG"
+                        and self._orientation in (None, 1)):
+                    self._resized_bytes = self.data
+                else:
+                    with timed("encode", record=self.timings):
+                        img_byte_arr = io.BytesIO()
+                        resized.save(img_byte_arr, format="JPEG")
+                        self._resized_bytes = img_byte_arr.getvalue()
+            return self._resized_bytes
+
+    @property
+    def array(self):
+        # ultralytics 입력용 BGR 배열 - 모델마다 PIL 변환을 반복하지 않도록 한 번만 생성
+        with self._lock:
+            if self._array is None:
+                self._array = np.ascontiguousarray(np.asarray(self.resized)[:, :, ::-1])
+            return self._array
@@ -0,0 +1,28 @@
+from config import env_setting
+from metrics import Counter
+
+# KT 음식 api 호출 생략 - 로컬 YOLO 앙상블을 먼저 실행하고 결과가 확실하면 KT 를 호출하지 않음
+#   BP_KT_GATE           : 1 이면 사용 (0 = 기존처럼 항상 KT 호출)
+#   BP_KT_GATE_CONF      : 앙상블(WBF) 결과의 모든 박스가 이 값 이상이면 KT 호출 생략
+#   BP_KT_GATE_NUTRITION : 1 이면 모든 음식의 영양 정보가 로컬(nutrition.py)에 있을 때만 생략
+#                          (서버 시작 직후에는 KT 응답이 쌓일 때까지 항상 호출)
+KT_GATE = env_setting("BP_KT_GATE", False)
+KT_GATE_CONF = env_setting("BP_KT_GATE_CONF", 0.70)
+KT_GATE_NUTRITION = env_setting("BP_KT_GATE_NUTRITION", True)
+
+kt_gate_total = Counter("bp_kt_gate_total", "KT call gate decisions by outcome and reason", ("outcome", "reason"))
+
+
+def call_reason(dishes, lookup):
+    # dishes : 로컬 앙상블 결과 [(음식 이름, 점수)] - KT 를 호출해야 하는 이유 (None = 생략)
+    if not dishes:
+        return "empty"
+    if min(score for _, score in dishes) < KT_GATE_CONF:
+        return "low_confidence"
+    if KT_GATE_NUTRITION and any(lookup(name) is None for name, _ in dishes):
+        return "no_nutrition"
+    return None
+
+
+def record(reason):
+    kt_gate_total.inc(outcome="skipped" if reason is None else "called", reason=reason or "confident")
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from config import env_setting
+from nutrition import normalize_name
+
+# 모델 / KT 음식 이름 -> 하나의 라벨 번호 (WBF 라벨)
+#   - 기준 음식 목록(학습에 사용한 Food_OD.yaml 의 150 종)이 0 ~ 149 번, 모델 / KT 에서 처음 나온 이름은 그 뒤 번호
+#   - 공백 차이, "떡국_만두국" 처럼 합쳐진 클래스의 각 이름, SYNONYMS 의 다른 표기는 같은 번호
+#   - 서버 시작 시 모델 클래스 이름으로 한 번 만들고 가중치 폴더에 저장 (요청마다 매핑을 다시 만들지 않음)
+#   - 기준 목록 / 동의어 / 모델 클래스가 바뀌면 기존 번호는 유지하고 version 을 올려서 다시 저장
+#
+#   BP_LABEL_VOCAB : 기준 음식 목록 (yaml 의 names)
+#   BP_LABEL_INDEX : 저장 경로 (기본값: 첫 번째 가중치와 같은 폴더의 label_index.json)
+LABEL_VOCAB = env_setting("BP_LABEL_VOCAB", "../BP_OB_Model/Food_OD.yaml")
+LABEL_INDEX_PATH = env_setting("BP_LABEL_INDEX", "")
+
+# 같은 음식의 다른 표기 -> 기준 이름
+SYNONYMS = {
+    "북어국": "북엇국",
+    "닭개장": "닭계장",
+    "프라이드치킨": "후라이드치킨",
+    "달걀말이": "계란말이",
+    "달걀찜": "계란찜",
+    "달걀국": "계란국",
+    "달걀프라이": "계란후라이",
+    "계란프라이": "계란후라이",
+    "소시지볶음": "소세지볶음",
+    "쭈꾸미볶음": "주꾸미볶음",
+    "떡국": "떡국_만두국",
+    "만둣국": "떡국_만두국",
+    "설렁탕": "곰탕_설렁탕",
+}
+
+
+def _alias_keys(name):
+    # 이름 자체 + "_" 로 합쳐진 클래스의 각 이름
+    keys = [normalize_name(name)]
+    if "_" in name:
+        keys.extend(normalize_name(part) for part in name.split("_") if part.strip())
+    return keys
+
+
+def load_vocabulary(path=LABEL_VOCAB):
+    if not path or not os.path.exists(path):
+        print("@label-index vocabulary not found:", path)
+        return []
+    import yaml
+    with open(path, encoding="utf-8") as f:
+        names = yaml.safe_load(f).get("names", [])
+    return list(names.values()) if isinstance(names, dict) else list(names)
+
+
+class LabelIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.version = 0
+        self.fingerprint = None
+        self.labels = []
+        self.models = {}
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._added = 0
+
+    def _add_label(self, name):
+        label = len(self.labels)
+        self.labels.append(name)
+        for key in _alias_keys(name):
+            self._ids.setdefault(key, label)
+        return label
+
+    def _add_synonyms(self):
+        for alias, name in SYNONYMS.items():
+            label = self._ids.get(normalize_name(name))
+            if label is not None:
+                self._ids.setdefault(normalize_name(alias), label)
+
+    def label_id(self, name):
+        # 처음 보는 이름(KT 등)은 새 번호를 붙여서 이후 요청에서도 같은 번호 사용 (파일에는 저장하지 않음)
+        key = normalize_name(name)
+        label = self._ids.get(key)
+        if label is None:
+            with self._lock:
+                label = self._ids.get(key)
+                if label is None:
+                    label = self._add_label(name)
+                    self._added += 1
+        return label
+
+    def name(self, label):
+        return self.labels[label]
+
+    def build(self, model_names, vocabulary=None):
+        # model_names : {가중치 파일 이름: 클래스 이름 list}
+        vocabulary = load_vocabulary() if vocabulary is None else vocabulary
+        names = [name for class_names in model_names.values() for name in class_names]
+        fingerprint = hashlib.sha1(json.dumps(
+            {"vocabulary": vocabulary, "synonyms": SYNONYMS, "models": model_names}, ensure_ascii=False, sort_keys=True
+        ).encode("utf-8")).hexdigest()
+
+        saved = self._read()
+        with self._lock:
+            self.labels, self.models, self._ids, self._added = [], {}, {}, 0
+            if saved is not None:
+                self.version = saved["version"]
+                for name in saved["labels"]:
+                    self._add_label(name)
+            if saved is not None and saved.get("fingerprint") == fingerprint:
+                self._add_synonyms()
+                self.fingerprint = fingerprint
+                self.models = saved.get("models", {})
+                print(f"@label-index loaded v{self.version} ({len(self.labels)} labels) from {self.path}")
+                return self
+            # 기준 목록 -> 동의어 -> 모델 클래스 순서 (모델의 다른 표기는 기준 이름의 번호 사용)
+            for name in vocabulary:
+                if normalize_name(name) not in self._ids:
+                    self._add_label(name)
+            self._add_synonyms()
+            for name in names:
+                if normalize_name(name) not in self._ids:
+                    self._add_label(name)
+            self.version += 1
+            self.fingerprint = fingerprint
+            self.models = {weight: [self._ids[normalize_name(name)] for name in class_names]
+                           for weight, class_names in model_names.items()}
+        self._write()
+        print(f"@label-index built v{self.version} ({len(self.labels)} labels) -> {self.path}")
+        return self
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as error:
+            print("@label-index read failed:", error)
+            return None
+
+    def _write(self):
+        if not self.path:
+            return
+        data = {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "created_at": time.time(),
+            "labels": self.labels,
+            "models": self.models,
+        }
+        try:
+            # 여러 worker 가 동시에 써도 깨지지 않도록 임시 파일에 쓴 뒤 교체
+            directory = os.path.dirname(self.path) or "."
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False, suffix=".tmp") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(f.name, self.path)
+        except OSError as error:
+            print("@label-index write failed:", error)
+
+    def stats(self):
+        return {"path": self.path, "version": self.version, "labels": len(self.labels),
+                "aliases": len(self._ids), "added_at_runtime": self._added}
+
+
+def index_path(weights):
+    if LABEL_INDEX_PATH:
+        return LABEL_INDEX_PATH
+    return os.path.join(os.path.dirname(weights[0]), "label_index.json") if weights else ""
+
+
+label_index = LabelIndex()
+
+
+def build_label_index(model_list, weights):
+    # 서버 시작 시 (모델 로드 후) 한 번 실행
+    label_index.path = index_path(weights)
+    return label_index.build({os.path.basename(model.weight): list(model.names.values()) for model in model_list})
@@ -0,0 +1,157 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus text 형식 metric (외부 라이브러리 없이 /metrics 로 노출)
+# 프로세스별 값이므로 여러 worker 로 실행하는 경우 worker 별로 수집됨
+
+# 단계별 지연 시간 bucket (초)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _label_text(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self):
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _label_text(self.labelnames, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# 요청 단계별 지연 시간
+#   upload_read, decode, resize, encode, ocr_roundtrip, kt_roundtrip, model_predict, wbf, serialization, total
+stage_seconds = Histogram("bp_stage_seconds", "Latency of each predict stage in seconds", ("stage", "model"))
+
+# OCR(0) / KT & 탐지(1) 분기 횟수
+infer_result_total = Counter("bp_infer_result_total", "Requests routed by inferResult", ("result",))
+
+# 외부 api 오류 (status 코드 또는 exception 이름)
+external_api_errors_total = Counter("bp_external_api_errors_total", "External API errors", ("api", "kind"))
+external_api_retries_total = Counter("bp_external_api_retries_total", "External API retries", ("api",))
+
+requests_total = Counter("bp_requests_total", "Handled requests", ("endpoint", "status"))
+
+# 외부 api 장애 대응 (circuit breaker 상태 0 closed / 1 half-open / 2 open, 기능 축소 응답 사유)
+circuit_state = Gauge("bp_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("api",))
+circuit_transitions_total = Counter("bp_circuit_transitions_total", "Circuit breaker transitions", ("api", "state"))
+degraded_total = Counter("bp_degraded_total", "Degraded responses by reason", ("reason",))
+
+
+@contextmanager
+def stopwatch(record, key):
+    # 요청별 단계 시간(ms)을 dict 에 기록 (result log 용)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record[key] = round((time.perf_counter() - start) * 1000, 3)
+
+
+@contextmanager
+def timed(stage, record=None, **labels):
+    # histogram 에 기록하고, record 가 있으면 요청별 timings 에도 기록
+    key = ":".join([stage, *(str(value) for value in labels.values())])
+    with stage_seconds.time(stage=stage, **labels), stopwatch(record, key):
+        yield
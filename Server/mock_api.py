@@ -0,0 +1,205 @@
+import argparse
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from flask import Flask, request
+from flask import make_response
+from PIL import Image
+
+# KT 음식 인식 api / Clova OCR api 로컬 대체 서버 (부하 테스트 / 벤치마크용, 유료 호출 없음)
+# model_api.py 가 파싱하는 응답 형식과 같은 형태로 응답
+#   KT    : POST /kt/vision/food  -> {"code": ..., "data": [{region: {"prediction_top1": {...}, "position": [...]}}]}
+#   Clova : POST /clova/ocr       -> {"images": [{"inferResult": ..., "receipt": {"result": {"subResults": [...]}}}]}
+#
+# 서버 연결 (secrets.json 또는 환경 변수)
+#   BP_SECRET_KT_FOOD_URL=http://127.0.0.1:5100/kt/vision/food
+#   BP_SECRET_CLOVA_OCR_INVOKE_URL=http://127.0.0.1:5100/clova/ocr
+#
+# 지연 시간 분포 형식
+#   fixed:<ms> | uniform:<min_ms>:<max_ms> | normal:<mean_ms>:<std_ms> | lognormal:<median_ms>:<sigma>
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOOD_EXAMPLE = os.path.join(ROOT_DIR, "result_food_request_example 1")
+OCR_EXAMPLE = os.path.join(ROOT_DIR, "result_OCR_request_example")
+
+
+def load_example(path):
+    # 예시 파일은 // 주석이 포함된 json
+    with open(path, encoding="utf-8") as f:
+        text = re.sub(r"^\s*//.*$", "", f.read(), flags=re.MULTILINE)
+    return json.loads(text)
+
+
+def parse_latency(spec):
+    kind, *params = spec.split(":")
+    params = [float(param) for param in params]
+    if kind == "fixed":
+        return lambda: params[0]
+    if kind == "uniform":
+        return lambda: random.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(params[0]), params[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class TokenBucket:
+    # 초당 rate 개 요청 허용 (burst 만큼 순간 허용)
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockService:
+    def __init__(self, name, latency, error_rate, rate_limit):
+        self.name = name
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "bad_requests": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def admit(self):
+        # 요청 처리 전 지연 / 속도 제한 / 오류 주입, 정상 처리할 경우 None 반환
+        self.count("requests")
+        if self.bucket is not None and not self.bucket.allow():
+            self.count("rate_limited")
+            return json_response({"code": 429, "message": "Too Many Requests"}, 429)
+        time.sleep(self.latency() / 1000)
+        if random.random() < self.error_rate:
+            self.count("errors")
+            return json_response({"code": 503, "message": "injected error"}, random.choice([500, 502, 503]))
+        return None
+
+
+def json_response(data, status=200):
+    res = make_response(json.dumps(data, ensure_ascii=False), status)
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+
+def kt_regions_from_example(example):
+    return [info for _, info in sorted(example["predict"]["ktFoodsInfo"].items())]
+
+
+def ocr_items_from_example(example):
+    return [{"name": {"text": name}, "count": {"text": "1"}} for name in example["predict"]["foodNames"]]
+
+
+def create_app(kt, clova, receipt_rate, max_regions):
+    app = Flask(__name__)
+    kt_regions = kt_regions_from_example(load_example(FOOD_EXAMPLE))
+    ocr_items = ocr_items_from_example(load_example(OCR_EXAMPLE))
+
+    @app.route('/kt/vision/food', methods=['POST'])
+    def kt_food():
+        if not all(request.headers.get(key) for key in ("x-client-key", "x-client-signature", "x-auth-timestamp")):
+            kt.count("bad_requests")
+            return json_response({"code": 401, "message": "missing auth headers"}, 401)
+        if 'media' not in request.files or ('metadata' not in request.files and 'metadata' not in request.form):
+            kt.count("bad_requests")
+            return json_response({"code": 400, "message": "metadata and media are required"}, 400)
+        rejected = kt.admit()
+        if rejected is not None:
+            return rejected
+
+        try:
+            with Image.open(io.BytesIO(request.files['media'].read())) as img:
+                width, height = img.size
+        except Exception:
+            kt.count("bad_requests")
+            return json_response({"code": 400, "message": "invalid image"}, 400)
+
+        regions = {}
+        for index, info in enumerate(random.sample(kt_regions, random.randint(1, min(max_regions, len(kt_regions))))):
+            box_width = random.uniform(0.15, 0.4) * width
+            box_height = random.uniform(0.15, 0.4) * height
+            x = random.uniform(0, width - box_width)
+            y = random.uniform(0, height - box_height)
+            regions[f"region_{index}"] = {
+                "prediction_top1": dict(info, confidence=round(random.uniform(0.2, 0.95), 8)),
+                "position": [
+                    {"location_type": "LEFT_TOP", "x": f"{x:.4f}", "y": f"{y:.4f}"},
+                    {"location_type": "RIGHT_BOTTOM", "x": f"{x + box_width:.4f}", "y": f"{y + box_height:.4f}"},
+                ],
+            }
+        return json_response({"code": 200, "data": [regions]})
+
+    @app.route('/clova/ocr', methods=['POST'])
+    def clova_ocr():
+        if not request.headers.get('X-OCR-SECRET'):
+            clova.count("bad_requests")
+            return json_response({"code": "0002", "message": "Authentication failed"}, 401)
+        if 'file' not in request.files or 'message' not in request.form:
+            clova.count("bad_requests")
+            return json_response({"code": "0011", "message": "message and file are required"}, 400)
+        rejected = clova.admit()
+        if rejected is not None:
+            return rejected
+
+        message = json.loads(request.form['message'])
+        image = {"uid": message.get("requestId", ""), "name": "demo"}
+        if random.random() < receipt_rate:
+            items = random.sample(ocr_items, random.randint(1, len(ocr_items)))
+            image.update({"inferResult": "SUCCESS", "message": "SUCCESS",
+                          "receipt": {"result": {"subResults": [{"items": items}]}}})
+        else:
+            image.update({"inferResult": "ERROR", "message": "Not a receipt"})
+        return json_response({"version": message.get("version", "V2"), "requestId": message.get("requestId", ""),
+                              "timestamp": int(time.time() * 1000), "images": [image]})
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return json_response({"kt": kt.stats, "clova": clova.stats})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the KT food and Clova OCR APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--kt-latency", default="lognormal:350:0.35")
+    parser.add_argument("--kt-error-rate", type=float, default=0.0)
+    parser.add_argument("--kt-rate-limit", type=float, default=0.0, help="초당 허용 요청 수 (0 = 제한 없음)")
+    parser.add_argument("--clova-latency", default="lognormal:600:0.3")
+    parser.add_argument("--clova-error-rate", type=float, default=0.0)
+    parser.add_argument("--clova-rate-limit", type=float, default=0.0, help="초당 허용 요청 수 (0 = 제한 없음)")
+    parser.add_argument("--receipt-rate", type=float, default=0.1, help="OCR 이 영수증으로 응답할 비율")
+    parser.add_argument("--max-regions", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    kt = MockService("kt", args.kt_latency, args.kt_error_rate, args.kt_rate_limit)
+    clova = MockService("clova", args.clova_latency, args.clova_error_rate, args.clova_rate_limit)
+    app = create_app(kt, clova, args.receipt_rate, args.max_regions)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
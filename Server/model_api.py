@@ -1,11 +1,9 @@
-import io
 import json
 from flask import Flask, request
-from flask import make_response
-from PIL import Image
-from ultralytics import YOLO
-import requests
+from flask import make_response, send_file, Response, stream_with_context
 import os
+# keep-alive http client (KT / Clova)
+from api_client import KT_FOOD_URL, kt_client, clova_client
 # kt-api lib
 from datetime import datetime
 import hmac, hashlib
@@ -13,85 +11,115 @@ from pytz import timezone
 # naver-api lib
 import uuid
 import time
-# ensemble lib
-from ensemble_boxes import *
-import torch
-from collections import defaultdict
+# ensemble lib (ensemble_boxes.weighted_boxes_fusion 과 같은 결과의 numpy 구현)
+import numpy as np
+from wbf import weighted_boxes_fusion
+# fan-out lib
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, TimeoutError as FutureTimeout
+# secrets / 설정
+from config import load_config, env_setting
+# stage metrics
+from metrics import timed, stopwatch, stage_seconds, infer_result_total, requests_total, degraded_total, render as render_metrics
+# buffered result log
+from result_log import result_log
+# request profiling
+from profiling import profile_request, profiled, admin_allowed, list_profiles, profile_path, profile_text, SORT_KEYS
+# decode-once image pipeline
+from image_context import ImageContext
+# content-addressed result cache
+from result_cache import response_cache, ocr_cache, kt_cache, detection_cache, cache_stats
+# model registry (ultralytics 는 모델을 로드할 때 import)
+from model_registry import MODEL_WEIGHTS, model_stats, process_memory
+# background model load + warmup, /healthz /readyz
+from startup import Startup, READY_WAIT_SEC, warmup_jpeg
+# per-request deadline (circuit breaker 는 api_client 에서 처리)
+from resilience import Deadline, DeadlineExceeded, CircuitOpenError, OCR_BUDGET
+# local receipt / food pre-classification
+from receipt_router import RECEIPT_ROUTER, route_image, receipt_route_total
+# confidence-gated KT call skip + local nutrition info
+from kt_gate import KT_GATE, call_reason as kt_call_reason, record as record_kt_gate
+from nutrition import nutrition_store, normalize_name, NUTRITION_ATTACH
+# unified label index (모델 클래스 / KT 음식 이름 -> WBF 라벨)
+from label_index import label_index, build_label_index
+# confidence-gated model cascade
+from cascade import CASCADE, order_models, escalation_reason, record as record_cascade
+# coalescing of identical in-flight uploads
+from singleflight import SingleFlight
+# upload size caps / header-only validation
+from upload import UploadRequest, UploadError, read_upload, MAX_REQUEST_BYTES, MAX_PREDICT_BYTES
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.datastructures import FileStorage
 
 app = Flask(__name__)
+# 업로드는 크기 제한 + 큰 파일은 임시 파일로 받음 (upload.py)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+app.config['MAX_FORM_MEMORY_SIZE'] = 1024 * 1024
+
+# api 키 설정 - 필수 키가 없으면 서버 시작 시 바로 실패
+config = load_config()
+config.start_watch(env_setting("BP_CONFIG_RELOAD_INTERVAL", 10.0))
+
+# 학습 모델 리스트 - 프로세스 시작 시 한 번만 로드하여 모든 요청이 공유
+# 로드 / warmup 은 startup 이 채움 (아래 startup.start())
+model_list = []
+
+# OCR / KT / 모델 추론을 동시에 실행하는 thread pool
+# BP_SPECULATIVE_FANOUT=0 이면 OCR 판정 후에 KT / 모델 추론을 시작 (영수증 요청의 KT 호출 비용 절약)
+FANOUT_WORKERS = env_setting("BP_FANOUT_WORKERS", 8)
+SPECULATIVE_FANOUT = env_setting("BP_SPECULATIVE_FANOUT", True)
+executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="bp-fanout")
+
+# WBF 설정 (iou 기준 / 무시할 박스 점수 / 응답에 포함할 최소 점수)
+WBF_IOU_THR = 0.55
+WBF_SKIP_BOX_THR = 0.20
+WBF_SCORE_THR = 0.4
+
+# /predict/batch 설정
+#   BP_BATCH_MAX_IMAGES      : 한 요청에 보낼 수 있는 최대 이미지 수 (넘으면 413)
+#   BP_BATCH_SIZE            : 로컬 모델 한 번의 forward 에 넣는 이미지 수
+#   BP_BATCH_API_CONCURRENCY : batch 요청들이 함께 쓰는 OCR / KT 외부 api 동시 호출 수
+BATCH_MAX_IMAGES = env_setting("BP_BATCH_MAX_IMAGES", 64)
+BATCH_SIZE = env_setting("BP_BATCH_SIZE", 8)
+BATCH_API_CONCURRENCY = env_setting("BP_BATCH_API_CONCURRENCY", 4)
+batch_api_executor = ThreadPoolExecutor(max_workers=BATCH_API_CONCURRENCY, thread_name_prefix="bp-batch-api")
+# multipart part 수 제한 (이미지 + 일반 form 필드)
+app.config['MAX_FORM_PARTS'] = BATCH_MAX_IMAGES + 16
+
+def warmup_pipeline():
+    # 로드한 모델의 클래스 이름으로 라벨 index 를 만들거나 저장된 index 를 읽음
+    build_label_index(model_list, MODEL_WEIGHTS)
+    # 영양 정보 저장소를 열어서 메모리로 읽음 (BP_NUTRITION_CSV 등록 포함)
+    nutrition_store.open()
+    # 외부 api / 캐시는 건드리지 않고 디코딩 / 리사이즈 / 인코딩 / WBF 경로만 미리 실행
+    image = ImageContext(warmup_jpeg())
+    image.array
+    image.resized_bytes
+    boxes = [np.array([[0.1, 0.1, 0.5, 0.5]]), np.array([[0.12, 0.1, 0.5, 0.52]])]
+    weighted_boxes_fusion(boxes, [np.array([0.9]), np.array([0.8])], [np.array([0]), np.array([0])],
+                          iou_thr=0.55, skip_box_thr=0.20, conf_type='max')
+
+startup = Startup(MODEL_WEIGHTS, model_list, warmup=warmup_pipeline)
+
+# 같은 이미지의 /predict 가 동시에 들어오면 한 번만 추론 (singleflight.py)
+predict_flight = SingleFlight("predict")
 
 def img_resize(img):
     try:
-        # 이미지를 열고 크기 가져오기
-        with Image.open(io.BytesIO(img)) as img:
-            width, height = img.size
-            print("@hello14 :", width, height)
-
-            # 최소 및 최대 크기 정의
-            minWidth, maxWidth = (720, 2560) if width > height else (720, 1440)
-            minHeight, maxHeight = (1080, 1440) if width > height else (1080, 2560)
-            print("@hello14 :", minWidth, minHeight, maxWidth, maxHeight)
-            if minWidth <= width <= maxWidth and minHeight <= height <= maxHeight:
-                print("Image meets size requirements. No resizing needed.")
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='JPEG')
-                return img_byte_arr.getvalue()
-
-            # 이미지 크기 조정
-            newWidth, newHeight = width, height
-            if width < minWidth or height < minHeight:
-                # 이미지 확대
-                if width / height > 1:
-                    # 넓은 이미지
-                    newHeight = max(height, minHeight)
-                    newWidth = round(newHeight * (width / height))
-                    if newWidth < minWidth:
-                        newWidth = minWidth
-                        newHeight = round(newWidth / (width / height))
-                else:
-                    # 높은 이미지
-                    newWidth = max(width, minWidth)
-                    newHeight = round(newWidth / (width / height))
-                    if newHeight < minHeight:
-                        newHeight = minHeight
-                        newWidth = round(newHeight * (width / height))
-            elif width > maxWidth or height > maxHeight:
-                # 이미지 축소
-                if width / height > 1:
-                    # 넓은 이미지
-                    newWidth = min(width, maxWidth)
-                    newHeight = round(newWidth / (width / height))
-                    if newHeight > maxHeight:
-                        newHeight = maxHeight
-                        newWidth = round(newHeight * (width / height))
-                else:
-                    # 높은 이미지
-                    newHeight = min(height, maxHeight)
-                    newWidth = round(newHeight / (width / height))
-                    if newWidth > maxWidth:
-                        newWidth = maxWidth
-                        newHeight = round(newWidth / (width / height))
-
-            # 조정된 크기 출력 및 이미지 크기 조정
-            print("@hello15 : Resized Image Size:", newWidth, newHeight)
-            resized_img = img.resize((newWidth, newHeight))
-            img_byte_arr = io.BytesIO()
-            resized_img.save(img_byte_arr, format='JPEG')
-            return img_byte_arr.getvalue()
+        # 이미지를 열고 크기 가져오기 (필요한 경우에만 리사이즈 / 재인코딩)
+        if not isinstance(img, ImageContext):
+            img = ImageContext(img)
+        print("@hello14 :", *img.size)
+        return img.resized_bytes
     except Exception as error:
         print("Error resizing image:", error)
         return None
 
 def get_secret(setting):
-    secret_file = "secrets.json"
-    try:
-        with open(secret_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[setting]
-    except KeyError:
-        print("Set the {} environment variable".format(setting))
+    # 시작 시 읽어 둔 설정에서 조회 (요청마다 secrets.json 을 읽지 않음)
+    return config[setting]
 
-def food_api(img):
+def food_api(img, deadline=None):
     point_list = []
     food_api_result = {}
     # timestamp 생성
@@ -107,7 +135,7 @@ def food_api(img):
     ).hexdigest()
 
 
-    url = "https://aiapi.genielabs.ai/kt/vision/food"
+    url = config.get("kt_food_url", KT_FOOD_URL)
     client_key = get_secret("kt_client_key")
     signature = signature
     timestamp = timestamp
@@ -127,7 +155,7 @@ def food_api(img):
     print("--------------",type(img))
     obj =  {'metadata': json.dumps(fields), 'media': img} # or "false"
 
-    response = requests.post(url, headers=headers, files=obj)
+    response = kt_client.post(url, headers=headers, files=obj, deadline=deadline)
 
     if response.ok:
         json_data = json.loads(response.text)
@@ -150,7 +178,7 @@ def food_api(img):
     else:
         print(f"Error: {response.status_code} - {response.text}")
         
-def OCR_api(img):
+def OCR_api(img, deadline=None):
     api_url = get_secret('CLOVA_OCR_Invoke_URL')
     secret_key = get_secret('naver_secret_key')
 
@@ -166,7 +194,8 @@ def OCR_api(img):
         'timestamp': int(round(time.time() * 1000))
     }
 
-    img_file = {'file': ('image.jpg', io.BytesIO(img), 'image/jpeg')}
+    # 재시도 시 다시 보낼 수 있도록 BytesIO 대신 bytes 그대로 전달
+    img_file = {'file': ('image.jpg', img, 'image/jpeg')}
     
     payload = {'message': json.dumps(request_json).encode('UTF-8')}
     files = [
@@ -176,179 +205,766 @@ def OCR_api(img):
     'X-OCR-SECRET': secret_key
     }
 
-    response = requests.request("POST", api_url, headers=headers, data = payload, files = img_file)
+    response = clova_client.post(api_url, headers=headers, data = payload, files = img_file, deadline=deadline)
     result = response.json()
     return result
 
-def get_prediction_wbf(img, model_list):
+def is_receipt(ocr_api_result):
+    if ocr_api_result['images'][0]['inferResult'] == 'ERROR':
+        return False
+    return len(ocr_api_result['images'][0]['receipt']['result']['subResults']) > 0
+
+def cached_ocr(image, deadline=None):
+    ocr_api_result = ocr_cache.get(image.digest)
+    if ocr_api_result is None:
+        with stopwatch(image.timings, "ocr"):
+            ocr_api_result = OCR_api(image.data, deadline=deadline)
+        # 정상 응답(images 포함)만 캐시
+        if 'images' in ocr_api_result:
+            ocr_cache.set(image.digest, ocr_api_result)
+    return ocr_api_result
+
+def cached_food_api(image, deadline=None):
+    # food_api 가 실패(None)하면 캐시하지 않음
+    def compute():
+        with stopwatch(image.timings, "kt"):
+            return food_api(image.resized_bytes, deadline=deadline)
+    return kt_cache.get_or_compute(image.digest, compute)
+
+# 외부 api 장애 시 기능 축소 (응답의 degraded 에 사유 기록)
+#   Clova 차단 / 실패 / 시간 초과 -> OCR 없이 음식 사진으로 처리
+#   KT 차단 / 실패 / 시간 초과    -> 로컬 모델 결과만 사용
+def guarded_ocr(image, deadline=None):
+    try:
+        ocr_api_result = cached_ocr(image, deadline or Deadline())
+    except CircuitOpenError:
+        return None, "ocr_skipped"
+    except Exception as error:
+        print("@degraded OCR:", error)
+        return None, "ocr_failed"
+    if 'images' not in ocr_api_result:
+        print("@degraded OCR:", ocr_api_result)
+        return None, "ocr_failed"
+    return ocr_api_result, None
+
+def local_only():
+    return [{}, []]
+
+def guarded_food_api(image, deadline=None):
+    try:
+        kt_result = cached_food_api(image, deadline or Deadline())
+    except CircuitOpenError:
+        return local_only(), "kt_skipped"
+    except Exception as error:
+        print("@degraded KT:", error)
+        return local_only(), "kt_failed"
+    if kt_result is None:
+        return local_only(), "kt_failed"
+    nutrition_store.remember(kt_result[0])
+    return kt_result, None
+
+def kt_gate(image, model_results):
+    # BP_KT_GATE=1 : 로컬 앙상블 결과가 모두 확실하면 KT 호출 생략 (True = 호출 필요)
+    try:
+        dishes = local_dishes(image, model_results)
+    except Exception as error:
+        print("Error during Weighted Boxes Fusion:", error)
+        dishes = []
+    reason = kt_call_reason(dishes, nutrition_store.lookup)
+    record_kt_gate(reason)
+    return reason is not None
+
+def gated_food_api(image, model_results, deadline=None):
+    # KT 를 호출하지 않은 경우 kt_result 는 None (fill_prediction 에서 로컬 영양 정보 사용)
+    if not kt_gate(image, model_results):
+        return None, None
+    return guarded_food_api(image, deadline)
+
+def mark_degraded(res, reason):
+    if reason and reason not in res['degraded']:
+        res['degraded'].append(reason)
+        degraded_total.inc(reason=reason)
+    return res
+
+def detection_result(result):
+    # 모델 추론 결과를 캐시 가능한 형태(list)로 변환
+    boxes = result.boxes
+    cls = boxes.cls.cpu().int().tolist()
+    return {
+        "xyxy": boxes.xyxy.cpu().tolist(),
+        "conf": boxes.conf.cpu().tolist(),
+        "cls": cls,
+        "names": [result.names[c] for c in cls],
+    }
+
+def detect(model, image):
+    def compute():
+        with timed("model_predict", record=image.timings, model=os.path.basename(model.weight)):
+            result = model.predict(image.array)[0]
+        return detection_result(result)
+    return detection_cache.get_or_compute(f"{image.digest}:{model.weight}", compute)
+
+def detect_batch(model, images):
+    # 캐시에 없는 이미지만 모아서 한 번의 forward 로 추론 (/predict/batch)
+    keys = [f"{image.digest}:{model.weight}" for image in images]
+    results = [detection_cache.get(key) for key in keys]
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        with timed("model_predict_batch", model=os.path.basename(model.weight)):
+            outputs = model.predict([images[index].array for index in missing])
+        for index, output in zip(missing, outputs):
+            results[index] = detection_result(output)
+            detection_cache.set(keys[index], results[index])
+    return results
+
+def split_cascade(model_list):
+    # cascade 모드이면 가장 빠른 모델만 먼저 실행하고 나머지는 escalate() 에서 필요할 때 실행
+    models = order_models(model_list) if CASCADE else list(model_list)
+    if CASCADE and len(models) > 1:
+        return models[:1], models[1:]
+    return models, []
+
+def start_detection(image, model_list, deadline=None):
+    # KT api 호출과 각 모델 추론을 동시에 시작 (KT_GATE 이면 모델 결과를 본 뒤 gated_food_api 로 호출)
+    # 디코딩 / 리사이즈 / 인코딩은 ImageContext 에서 한 번만 수행되어 모든 작업이 공유
+    first_models, remaining = split_cascade(model_list)
+    kt_future = None if KT_GATE else executor.submit(profiled(guarded_food_api), image, deadline)
+    model_futures = [executor.submit(profiled(detect), model, image) for model in first_models]
+    return kt_future, model_futures, remaining
+
+def wait_models(futures, deadline=None, res=None):
+    # 모델 추론은 모델별 lock 에서 순서를 기다릴 수 있으므로 요청 deadline 안에 끝난 결과만 사용
+    # 늦은 모델은 제외하고 응답에 detection_timeout 기록 (deadline 이 없으면 끝날 때까지 대기 - /predict/batch)
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=None if deadline is None else deadline.remaining()))
+        except FutureTimeout:
+            future.cancel()
+            if res is not None:
+                mark_degraded(res, "detection_timeout")
+    return results
+
+def escalate(image, kt_result, model_results, remaining, deadline=None, res=None):
+    # 첫 모델 결과가 불확실하거나 KT 영역과 맞지 않을 때만 나머지 모델을 추가로 실행
+    # (첫 모델이 deadline 안에 끝나지 않은 경우 escalation 하지 않음)
+    if not remaining or not model_results:
+        return model_results
+    reason = escalation_reason(model_results[0], kt_result)
+    record_cascade(reason)
+    if reason is None:
+        return model_results
+    futures = [executor.submit(profiled(detect), model, image) for model in remaining]
+    return model_results + wait_models(futures, deadline, res)
+
+def escalate_before_gate(image, model_results, remaining, deadline=None, res=None):
+    # KT_GATE : KT 호출 여부를 정하기 전에는 첫 모델 결과만으로 판단 (uncertain 이면 바로 escalation)
+    #           empty / kt_disagree 는 KT 를 호출한 경우 그 결과로 escalate() 에서 다시 판단
+    #           -> (모델 결과, 아직 실행하지 않은 모델)
+    if remaining and model_results and escalation_reason(model_results[0], None) is not None:
+        return escalate(image, None, model_results, remaining, deadline, res), []
+    return model_results, remaining
+
+def receipt_route(image):
+    # BP_RECEIPT_ROUTER=1 이면 원격 호출 전에 로컬에서 영수증 / 음식 사진 분류 (food / receipt / both)
+    if not RECEIPT_ROUTER:
+        return "both"
+    route, _ = route_image(image)
+    return route
+
+def run_inference(img, res, deadline=None):
+    # OCR / KT / 로컬 탐지를 동시에 시작하고 OCR 판정에 따라 결과를 사용하거나 취소
+    # 외부 api / 로컬 탐지는 요청 deadline 안에서만 기다림 (OCR 은 그중 OCR_BUDGET 까지, 늦은 모델은 결과에서 제외)
+    # 로컬 분류가 음식 사진이면 OCR 을 생략하고, 영수증이면 OCR 결과를 본 뒤에만 KT / 탐지 실행
+    image = img if isinstance(img, ImageContext) else ImageContext(img)
+    deadline = deadline or Deadline()
+    route = receipt_route(image)
+    ocr_future = None
+    if route != "food":
+        ocr_future = executor.submit(profiled(guarded_ocr), image, deadline)
+    kt_future, model_futures, remaining = None, [], []
+    started = False
+    try:
+        if route == "food" or (route == "both" and SPECULATIVE_FANOUT):
+            kt_future, model_futures, remaining = start_detection(image, model_list, deadline)
+            started = True
+
+        ocr_api_result, reason = None, None
+        if ocr_future is not None:
+            try:
+                ocr_api_result, reason = ocr_future.result(timeout=deadline.remaining(OCR_BUDGET))
+            except FutureTimeout:
+                ocr_api_result, reason = None, "ocr_timeout"
+        mark_degraded(res, reason)
+        print("@hello-1",ocr_api_result)
+        if ocr_api_result is None or not is_receipt(ocr_api_result):
+            if route == "receipt":
+                # 영수증으로 분류했지만 OCR 결과가 영수증이 아닌 경우
+                receipt_route_total.inc(route="receipt_fallback")
+            if not started:
+                kt_future, model_futures, remaining = start_detection(image, model_list, deadline)
+            if kt_future is None:
+                model_results, remaining = escalate_before_gate(
+                    image, wait_models(model_futures, deadline, res), remaining, deadline, res)
+                kt_result, reason = gated_food_api(image, model_results, deadline)
+                model_results = escalate(image, kt_result, model_results, remaining, deadline, res)
+            else:
+                try:
+                    kt_result, reason = kt_future.result(timeout=deadline.remaining())
+                except FutureTimeout:
+                    kt_result, reason = local_only(), "kt_timeout"
+                model_results = escalate(image, kt_result, wait_models(model_futures, deadline, res), remaining,
+                                         deadline, res)
+            mark_degraded(res, reason)
+            fill_prediction(res, image, kt_result, model_results)
+        else:
+            fill_receipt(res, ocr_api_result)
+    finally:
+        # 영수증으로 판정되었거나 오류가 난 경우 아직 시작되지 않은 작업은 취소
+        for future in [ocr_future, kt_future, *model_futures]:
+            if future is not None:
+                future.cancel()
+    return res
+
+def predict_chunk(images):
+    # 이미지 묶음을 처리하면서 끝나는 순서대로 (위치, 응답, 오류) 반환
+    # OCR / KT 는 batch_api_executor 로 동시 호출 수를 제한하고, 로컬 모델은 묶음 전체를 한 번에 추론
+    # deadline 은 각 api 호출이 실제로 시작될 때부터 계산 (동시 호출 수 제한으로 대기하는 시간 제외)
+    # 로컬 분류가 음식 사진인 이미지는 OCR 없이 바로 음식 사진으로 처리
+    routes = [receipt_route(image) for image in images]
+    ocr_futures = {}
+    for index, image in enumerate(images):
+        if routes[index] == "food":
+            future = Future()
+            future.set_result((None, None))
+        else:
+            future = batch_api_executor.submit(guarded_ocr, image)
+        ocr_futures[future] = index
+    kt_futures, detection_futures, food_indices = {}, [], []
+    degraded = {index: [] for index in range(len(images))}
+    first_models, remaining = split_cascade(model_list)
+    if SPECULATIVE_FANOUT:
+        if not KT_GATE:
+            kt_futures = {index: batch_api_executor.submit(guarded_food_api, image)
+                          for index, image in enumerate(images) if routes[index] != "receipt"}
+        detection_futures = [executor.submit(detect_batch, model, images) for model in first_models]
+    try:
+        for future in as_completed(ocr_futures):
+            index = ocr_futures[future]
+            try:
+                ocr_api_result, reason = future.result()
+                receipt = ocr_api_result is not None and is_receipt(ocr_api_result)
+            except Exception as error:
+                yield index, new_response(), error
+                continue
+            if reason:
+                degraded[index].append(reason)
+            if receipt:
+                if index in kt_futures:
+                    kt_futures.pop(index).cancel()
+                yield index, fill_receipt(new_response(), ocr_api_result), None
+                continue
+            food_indices.append(index)
+            if routes[index] == "receipt":
+                receipt_route_total.inc(route="receipt_fallback")
+            if index not in kt_futures and not KT_GATE:
+                kt_futures[index] = batch_api_executor.submit(guarded_food_api, images[index])
+        if not food_indices:
+            return
+
+        # 음식 사진만 모아서 추론 (speculative 인 경우 이미 묶음 전체를 추론 중)
+        if detection_futures:
+            positions = {index: index for index in food_indices}
+        else:
+            positions = {index: position for position, index in enumerate(food_indices)}
+            food_images = [images[index] for index in food_indices]
+            detection_futures = [executor.submit(detect_batch, model, food_images) for model in first_models]
+        try:
+            detections = [future.result() for future in detection_futures]
+        except Exception as error:
+            for index in food_indices:
+                yield index, new_response(), error
+            return
+
+        local_results = {}
+        if KT_GATE:
+            # 로컬 앙상블 결과를 먼저 보고 KT 가 필요한 이미지만 호출
+            for index in food_indices:
+                local_results[index] = escalate_before_gate(
+                    images[index], [detection[positions[index]] for detection in detections], remaining)
+                if kt_gate(images[index], local_results[index][0]):
+                    kt_futures[index] = batch_api_executor.submit(guarded_food_api, images[index])
+                else:
+                    kt_futures[index] = Future()
+                    kt_futures[index].set_result((None, None))
+
+        waiting = {kt_futures[index]: index for index in food_indices}
+        for future in as_completed(waiting):
+            index = waiting[future]
+            try:
+                kt_result, reason = future.result()
+                res = new_response()
+                for degraded_reason in degraded[index] + [reason]:
+                    mark_degraded(res, degraded_reason)
+                model_results, model_remaining = local_results.get(index) or (
+                    [detection[positions[index]] for detection in detections], remaining)
+                model_results = escalate(images[index], kt_result, model_results, model_remaining)
+                yield index, fill_prediction(res, images[index], kt_result, model_results), None
+            except Exception as error:
+                yield index, new_response(), error
+    finally:
+        # client 가 연결을 끊은 경우 등 아직 시작되지 않은 작업은 취소
+        for future in [*ocr_futures, *kt_futures.values(), *detection_futures]:
+            future.cancel()
+
+def new_response():
+    return {
+        # 0 : OCR , 1 : KT & OD
+        "inferResult": 0,
+        # mealType 
+        "mealType" : "",
+        #dayTime send
+        "dayTime" : "",
+        # predict Result
+        "predict": {
+            # predict food name
+            "foodNames": [],
+            # kt predict food info
+            "ktFoodsInfo": {},
+            # 음식별 출처 {"detected": ["local", "kt"], "nutrition": "kt" | "local" | null}
+            "foodSources": {}
+        },
+        # 외부 api 장애로 기능을 축소한 경우 사유 (ocr_skipped / ocr_failed / ocr_timeout / kt_skipped / kt_failed / kt_timeout)
+        "degraded": [],
+        # "image":[file]
+    }
+
+def fill_prediction(res, image, kt_result, model_results):
+    # kt_result 가 None 이면 KT 를 호출하지 않은 것 (KT_GATE) -> 영양 정보는 로컬 저장소에서
+    kt_called = kt_result is not None
+    kt_result = kt_result if kt_called else local_only()
+    food_api_result,od_result = get_prediction_wbf(
+        image, model_list=model_list, kt_result=kt_result, model_results=model_results
+    )
+    if not kt_called or NUTRITION_ATTACH:
+        # KT 가 영양 정보를 주지 않은 음식은 로컬 저장소 값으로 추가
+        food_api_result = local_food_info(od_result, model_results, dict(food_api_result))
+    res['inferResult'] = 1
+    res['predict']['ktFoodsInfo'] = food_api_result
+    res['predict']['foodNames'] = od_result
+    res['predict']['foodSources'] = food_sources(od_result, kt_result, food_api_result, model_results)
+    return res
+
+def local_confidences(model_results):
+    # 음식 이름별 로컬 모델 최고 점수
+    confidences = {}
+    for detection in model_results:
+        for name, conf in zip(detection["names"], detection["conf"]):
+            confidences[name] = max(confidences.get(name, 0.0), conf)
+    return confidences
+
+def local_food_info(food_names, model_results, food_info):
+    # KT 응답과 같은 형식 {region: prediction_top1}, confidence 는 로컬 모델 점수
+    # key 는 local_<번호> (KT region 번호가 연속이 아니어도 기존 항목을 덮어쓰지 않도록)
+    confidences = local_confidences(model_results)
+    known = {normalize_name(info.get('food_name', '')) for info in food_info.values()}
+    index = 0
+    for name in food_names:
+        if normalize_name(name) in known:
+            continue
+        info = nutrition_store.lookup(name)
+        if info is not None:
+            info['confidence'] = round(confidences.get(name, 0.0), 8)
+            while f"local_{index}" in food_info:
+                index += 1
+            food_info[f"local_{index}"] = info
+    return food_info
+
+def food_sources(food_names, kt_result, food_api_result, model_results):
+    # 음식별 출처 - detected : 박스를 찾은 곳 (local = YOLO 앙상블, kt = KT api)
+    #              nutrition : ktFoodsInfo 를 채운 곳 (kt = KT 응답, local = 로컬 저장소)
+    confidences = local_confidences(model_results)
+    kt_names = {item[4] for item in kt_result[1]}
+    kt_info = {normalize_name(info.get('food_name', '')) for info in kt_result[0].values()}
+    info_names = {normalize_name(info.get('food_name', '')) for info in food_api_result.values()}
+    sources = {}
+    for name in food_names:
+        detected = []
+        if confidences.get(name, 0.0) >= WBF_SKIP_BOX_THR:
+            detected.append("local")
+        if name in kt_names:
+            detected.append("kt")
+        key = normalize_name(name)
+        nutrition = "kt" if key in kt_info else "local" if key in info_names else None
+        sources[name] = {"detected": detected, "nutrition": nutrition}
+    return sources
+
+def fill_receipt(res, ocr_api_result):
+    for field in ocr_api_result['images'][0]['receipt']['result']['subResults'][0]['items']:
+        if field['name']['text'] not in res['predict']['foodNames']:
+            res['predict']['foodNames'].append(field['name']['text'])
+    return res
+
+def fuse_detections(image, point_list, model_results, stage="wbf"):
+    # 모델 / KT 박스를 WBF 로 합쳐서 [(음식 이름, 점수)] 반환 (점수 내림차순, 같은 이름은 최고 점수만)
     boxes_list = []
     scores_list = []
     labels_list = []
-
-    resized_img = Image.open(io.BytesIO(img))
-    # 초기 라벨 매핑 (이 예시에서는 비어있음)
-    label_mapping = {}
-    # kt 에서 찾은 음식이 이미 라벨링 되어 있을 경우를 상정
-    key_mapping = {}
-
-    img_width, img_height = resized_img.size
-    food_api_result,point_list = food_api(img)  # Ensure food_api is correctly defined
-    # Collect boxes, scores, and labels from each model
-    for model in model_list:
-        result = model.predict(resized_img)
-        print("@hello-result",result)
-        boxes = result[0].boxes
-        print("@hello-2",boxes)
-        if len(boxes.conf) > 0:
-            print("@hello3")
-            model_boxes = []
-            model_scores = []
-            model_labels = []
-            print("@hello4",boxes)
-            for i, box in enumerate(boxes.xyxy):
-                print("@hello4")
-                x_min, y_min, x_max, y_max = box
-                conf = boxes.conf[i]
-                cls_name = result[0].names[int(boxes.cls[i])]
-                cls = int(boxes.cls[i])
-
-                # 새로운 라벨을 매핑에 추가
-                if cls_name not in label_mapping:
-                    label_mapping[cls] = cls_name
-                    key_mapping[cls_name] = cls
-
-                model_boxes.append([x_min, y_min, x_max, y_max])
-                model_scores.append(conf)
-                model_labels.append(cls)
-            
-            boxes_list.append(model_boxes)
-            scores_list.append(model_scores)
+    # 라벨 번호는 label_index 가 모든 요청 / 모델에서 같은 번호로 정함
+    # 응답에 쓸 이름은 요청에서 처음 나온 이름 (모델 클래스 이름 우선, 없으면 KT 이름)
+    display_names = {}
+
+    img_width, img_height = image.resized.size
+    scale = np.array([img_width, img_height, img_width, img_height], dtype=np.float64)
+    # Collect boxes, scores, and labels from each model (모델별로 한 번에 numpy 변환 및 정규화)
+    for detection in model_results:
+        if len(detection["conf"]) > 0:
+            model_labels = np.asarray([label_index.label_id(name) for name in detection["names"]], dtype=np.int64)
+            for label, name in zip(model_labels.tolist(), detection["names"]):
+                display_names.setdefault(label, name)
+
+            boxes_list.append(np.asarray(detection["xyxy"], dtype=np.float64).reshape(-1, 4) / scale)
+            scores_list.append(np.asarray(detection["conf"], dtype=np.float64))
             labels_list.append(model_labels)
-            print("@@@@ labels_list :",labels_list)
 
-    # Add labels from point_list to the mapping
-    additional_labels = 150  # Start number for labels added from food_api
-    api_model_boxes = []
-    api_model_scores = []
+    # KT 음식 이름도 같은 index 로 (모델과 같은 음식이면 같은 라벨)
     api_model_labels = []
     for item in point_list:
-        x_min, y_min, x_max, y_max, food_name, confidence = item
-        if food_name not in key_mapping:
-            label_mapping[additional_labels] = food_name
-            api_model_labels.append(additional_labels)
-            additional_labels += 1
-        else:
-            api_model_labels.append(key_mapping[food_name])
-            additional_labels += 1
-        # Add the box to the last model's list
-        api_model_boxes.append([x_min, y_min, x_max, y_max])
-        api_model_scores.append(confidence)
-    boxes_list.append(api_model_boxes)
-    scores_list.append(api_model_scores)
-    labels_list.append(api_model_labels)
-    print("@@@@ labels_list :",labels_list)
-
-    # Normalize box coordinates and ensure consistency
-    for i in range(len(boxes_list)):
-        model_boxes = boxes_list[i]
-        model_scores = scores_list[i]
-        model_labels = labels_list[i]
-
-        if len(model_boxes) != len(model_scores) or len(model_boxes) != len(model_labels):
-            print(f"Error in model {i}: Length of boxes, scores, and labels do not match.")
-            print(f"Boxes: {len(model_boxes)}, Scores: {len(model_scores)}, Labels: {len(model_labels)}")
-            continue
-
-        # Normalize boxes and move to CPU if necessary
-        normalized_boxes = []
-        for box in model_boxes:
-            box = [b.cpu() if isinstance(b, torch.Tensor) else b for b in box]  # Move to CPU if tensor
-            x_min, y_min, x_max, y_max = box
-            normalized_boxes.append([x_min / img_width, y_min / img_height, x_max / img_width, y_max / img_height])
-        boxes_list[i] = normalized_boxes
+        label = label_index.label_id(item[4])
+        display_names.setdefault(label, item[4])
+        api_model_labels.append(label)
+    api_points = np.asarray([item[:4] for item in point_list], dtype=np.float64).reshape(-1, 4)
+    boxes_list.append(api_points / scale)
+    scores_list.append(np.asarray([item[5] for item in point_list], dtype=np.float64))
+    labels_list.append(np.asarray(api_model_labels, dtype=np.int64))
+    print("@@@@ labels_list :",[labels.tolist() for labels in labels_list])
 
     # Apply Weighted Boxes Fusion
-    try:
-        pred_list = []
+    with timed(stage, record=image.timings):
         _, wbf_scores, wbf_labels = weighted_boxes_fusion(
-            boxes_list, scores_list, labels_list, iou_thr=0.55, skip_box_thr=0.20, conf_type='max'
+            boxes_list, scores_list, labels_list, iou_thr=WBF_IOU_THR, skip_box_thr=WBF_SKIP_BOX_THR, conf_type='max'
         )
-        for index, scores in enumerate(wbf_scores):
-            if (scores >= 0.4) and (label_mapping[wbf_labels[index]] not in pred_list):
-                pred_list.append(label_mapping[wbf_labels[index]])
+    dishes = {}
+    for label, score in zip(wbf_labels, wbf_scores):
+        dishes.setdefault(display_names[int(label)], float(score))
+    return list(dishes.items())
+
+def local_dishes(image, model_results):
+    # KT 박스 없이 로컬 모델 결과만 합친 결과 (KT_GATE 판단용)
+    return fuse_detections(image, [], model_results, stage="kt_gate_wbf")
+
+def get_prediction_wbf(img, model_list, kt_result=None, model_results=None):
+    # bytes 로 받은 경우에도 디코딩은 한 번만
+    image = img if isinstance(img, ImageContext) else ImageContext(img)
+    # fan-out 에서 미리 받아온 KT / 모델 결과가 있으면 그대로 사용
+    if kt_result is None:
+        kt_result, _ = guarded_food_api(image)  # KT 실패 시 로컬 모델 결과만 사용
+    food_api_result,point_list = kt_result
+    if model_results is None:
+        model_results = [detect(model, image) for model in model_list]
+    try:
+        # 점수 순서를 유지하면서 중복 이름 제거
+        pred_list = [name for name, score in fuse_detections(image, point_list, model_results)
+                     if score >= WBF_SCORE_THR]
         return [food_api_result,pred_list]
     except Exception as e:
         print("Error during Weighted Boxes Fusion:", e)
 
 
+def error_response(endpoint, status_code, message, status):
+    requests_total.inc(endpoint=endpoint, status=status)
+    res = make_response(json.dumps({"error": message}, ensure_ascii=False), status_code)
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+@app.before_request
+def limit_request_size():
+    # MAX_CONTENT_LENGTH(MAX_REQUEST_BYTES) 는 /predict/batch 용, /predict 는 이미지 하나 크기까지만 받음
+    if request.endpoint == "predict":
+        request.max_content_length = MAX_PREDICT_BYTES
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    # Content-Length 가 요청 크기 제한을 넘으면 body 를 읽기 전에 거절
+    endpoint = "predict_batch" if request.path.endswith("/batch") else "predict"
+    return error_response(endpoint, 413, f"request too large (max {request.max_content_length} bytes)", "too_large")
+
+def not_ready(endpoint):
+    requests_total.inc(endpoint=endpoint, status="not_ready")
+    res = make_response(json.dumps(startup.status(), ensure_ascii=False), 503)
+    res.headers['Content-Type'] = 'application/json'
+    res.headers['Retry-After'] = '5'
+    return res
+
+
 @app.route('/predict', methods=['POST'])
+@profile_request
 def predict():
     # json 전송 format
     if request.method == 'POST':
-        file = request.files['food_image']
+        # 모델 warmup 이 끝나기 전에 들어온 요청은 잠시 기다렸다가 처리 (그래도 준비되지 않으면 503)
+        if not startup.wait(READY_WAIT_SEC):
+            return not_ready("predict")
+        request_start = time.perf_counter()
+        status = "ok"
+        file = request.files.get('food_image')
         print("@files-type",file)
-        img = file.read()
-
-        res = {
-            # 0 : OCR , 1 : KT & OD
-            "inferResult": 0,
-            # mealType 
-            "mealType" : "",
-            #dayTime send
-            "dayTime" : "",
-            # predict Result
-            "predict": {
-                # predict food name
-                "foodNames": [],
-                # kt predict food info
-                "ktFoodsInfo": {} 
-            },
-            # "image":[file]
-        }
-    # 학습 모델 리스트
-    model_list = []
-    model_weights=[
-        "../weights/yolov8m_train.pt",
-        "../weights/yolov5mu_train.pt"
-        # "../BP_OB_Model/runs/detect/train9/weights/best.pt",
-        # "../BP_OB_Model/runs/detect/train2/weights/best.pt",
-        # "../BP_OB_Model/runs/detect/train13/weights/best.pt"
-        ]
-    
-    for model_weight in model_weights:
-        model_yolov = YOLO(model_weight)
-        model_list.append(model_yolov)
-
+        upload_timings = {}
         try:
-            ocr_api_result = OCR_api(img)
-            print("@hello-1",ocr_api_result)
-            if (ocr_api_result['images'][0]['inferResult'] == 'ERROR') or (len(ocr_api_result['images'][0]['receipt']['result']['subResults']) == 0):
-                resized_img = img_resize(img)
-                food_api_result,od_result = get_prediction_wbf(resized_img,model_list=model_list)
-                res['inferResult'] = 1
-                res['predict']['ktFoodsInfo'] = food_api_result
-                res['predict']['foodNames'] = od_result
-
+            # 크기 / 형식 / 해상도를 header 만으로 먼저 확인 (디코딩 전에 4xx)
+            with timed("upload_read", record=upload_timings):
+                img = ImageContext(read_upload(file))
+        except UploadError as error:
+            return error_response("predict", error.status, error.message, "rejected")
+        img.timings.update(upload_timings)
+        request_id = uuid.uuid4().hex
+        cached = False
+        coalesced = False
+
+        res = new_response()
+        deadline = Deadline()
+        try:
+            # 같은 이미지를 다시 보낸 경우 캐시된 응답 사용
+            cached_res = response_cache.get(img.digest)
+            if cached_res is not None:
+                res = cached_res
+                cached = True
             else:
-                for field in ocr_api_result['images'][0]['receipt']['result']['subResults'][0]['items']:
-                    if field['name']['text'] not in res['predict']['foodNames']:
-                        res['predict']['foodNames'].append(field['name']['text'])
-
-            with open(f"../result.json", 'w', encoding='utf-8') as f:
-                json.dump(res, f, ensure_ascii=False, indent=4)
-
-            print("JSON file has been saved.")
+                # 같은 이미지를 처리 중인 요청이 있으면 그 결과를 요청 deadline 까지만 기다림
+                res, coalesced = predict_flight.do(img.digest, lambda: compute_response(img, deadline), deadline)
+            infer_result_total.inc(result="detection" if res['inferResult'] == 1 else "ocr")
+        except DeadlineExceeded as error:
+            print("Error:", error)
+            return error_response("predict", 504, str(error), "timeout")
         except Exception as error:
+            status = "error"
             print("Error:", error)
             
         # 주의!! #
         # jsonify를 사용하면 json.dump()와 똑같이 ascii 인코딩을 사용하기 때문에 한글 깨짐
         # return jsonify({'class_id': class_id, 'class_name': class_name})
         
-        res = make_response(json.dumps(res, ensure_ascii=False))
+        with timed("serialization", record=img.timings):
+            body = json.dumps(res, ensure_ascii=False)
+        body_degraded = res.get('degraded', [])
+        total = time.perf_counter() - request_start
+        stage_seconds.observe(total, stage="total")
+        requests_total.inc(endpoint="predict", status=status)
+        img.timings["total"] = round(total * 1000, 3)
+        # 결과 기록은 background writer 가 처리 (기존 ../result.json 덮어쓰기 대체)
+        result_log.submit({
+            "request_id": request_id,
+            "timestamp": time.time(),
+            "status": status,
+            "cached": cached,
+            "coalesced": coalesced,
+            "digest": img.digest,
+            "timings": img.timings,
+            "response": res,
+        })
+
+        res = make_response(body)
         res.headers['Content-Type'] = 'application/json'
+        res.headers['X-Request-Id'] = request_id
+        if coalesced:
+            res.headers['X-Coalesced'] = '1'
+        if body_degraded:
+            res.headers['X-Degraded'] = ",".join(body_degraded)
+        # 큰 JPEG 를 draft 모드로 축소 디코딩했는지 여부
+        res.headers['X-Decode-Fast-Path'] = '1' if img.fast_path else '0'
         
         return res
+
+def compute_response(img, deadline=None):
+    res = run_inference(img, new_response(), deadline)
+    # 기능 축소 응답은 캐시하지 않음 (api 가 복구되면 다시 전체 결과)
+    if not res['degraded']:
+        response_cache.set(img.digest, res)
+    return res
+
+# 여러 이미지를 한 번에 받아 끝나는 순서대로 한 줄에 하나씩 JSON 으로 응답 (application/x-ndjson)
+#   요청 : food_image 필드에 이미지 여러 개
+#   응답 줄 : {"index", "filename", "request_id", "status", "cached", "result"} (result 는 /predict 응답과 같은 형식)
+#   검증에 실패한 이미지는 status "rejected", result null, error {"code", "message"}
+#   업로드는 처리할 차례가 된 묶음(BP_BATCH_SIZE)만 읽고 디코딩, 응답 줄을 보낸 이미지는 바로 메모리에서 제거
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    if not startup.wait(READY_WAIT_SEC):
+        return not_ready("predict_batch")
+    files = request.files.getlist('food_image')
+    if not files:
+        requests_total.inc(endpoint="predict_batch", status="bad_request")
+        return make_response("food_image is required", 400)
+    if len(files) > BATCH_MAX_IMAGES:
+        requests_total.inc(endpoint="predict_batch", status="too_many_images")
+        return make_response(f"too many images (max {BATCH_MAX_IMAGES})", 413)
+
+    batch_id = uuid.uuid4().hex
+    # view 가 반환되면 (응답을 보내기 전) flask 가 요청을 닫으면서 업로드 파일도 닫으므로
+    # 임시 파일(spool)을 넘겨받아 응답을 보내면서 하나씩 읽고 닫음
+    uploads = [FileStorage(file.stream, file.filename, file.name, file.content_type) for file in files]
+    for file in files:
+        file.stream = FileStorage().stream
+    files = uploads
+    # (파일 이름, 처리 중인 ImageContext) - 응답 줄을 보낸 이미지는 None
+    entries = [(file.filename, None) for file in files]
+    rejected = {}
+
+    def load(index):
+        # 검증에 실패한 이미지는 처리하지 않고 해당 줄에 오류로 응답
+        file = files[index]
+        upload_timings = {}
+        try:
+            with timed("upload_read", record=upload_timings):
+                image = ImageContext(read_upload(file))
+        except UploadError as error:
+            rejected[index] = error
+            return None
+        finally:
+            # 임시 파일(spool)은 읽은 뒤 바로 닫음
+            file.close()
+        image.timings.update(upload_timings)
+        entries[index] = (file.filename, image)
+        return image
+
+    def release(index):
+        entries[index] = (entries[index][0], None)
+
+    def result_line(index, res, error, cached, batch_start):
+        filename, image = entries[index]
+        status = "ok" if error is None else "error"
+        if error is None:
+            infer_result_total.inc(result="detection" if res['inferResult'] == 1 else "ocr")
+            if not cached and not res['degraded']:
+                response_cache.set(image.digest, res)
+        else:
+            print("Error:", error)
+        requests_total.inc(endpoint="predict_batch", status=status)
+        request_id = uuid.uuid4().hex
+        image.timings["total"] = round((time.perf_counter() - batch_start) * 1000, 3)
+        result_log.submit({
+            "request_id": request_id,
+            "batch_id": batch_id,
+            "timestamp": time.time(),
+            "status": status,
+            "cached": cached,
+            "digest": image.digest,
+            "timings": image.timings,
+            "response": res,
+        })
+        line = {"index": index, "filename": filename, "request_id": request_id, "status": status,
+                "cached": cached, "result": res}
+        return json.dumps(line, ensure_ascii=False) + "\n"
+
+    def rejected_line(index):
+        error = rejected[index]
+        requests_total.inc(endpoint="predict_batch", status="rejected")
+        line = {"index": index, "filename": entries[index][0], "request_id": None, "status": "rejected",
+                "cached": False, "result": None, "error": {"code": error.status, "message": error.message}}
+        return json.dumps(line, ensure_ascii=False) + "\n"
+
+    def run_chunk(chunk, batch_start):
+        for position, res, error in predict_chunk([entries[index][1] for index in chunk]):
+            yield result_line(chunk[position], res, error, False, batch_start)
+            release(chunk[position])
+
+    def generate():
+        batch_start = time.perf_counter()
+        pending = []
+        for index in range(len(files)):
+            image = load(index)
+            if image is None:
+                yield rejected_line(index)
+                continue
+            cached_res = response_cache.get(image.digest)
+            if cached_res is not None:
+                yield result_line(index, cached_res, None, True, batch_start)
+                release(index)
+                continue
+            pending.append(index)
+            if len(pending) == BATCH_SIZE:
+                yield from run_chunk(pending, batch_start)
+                pending = []
+        if pending:
+            yield from run_chunk(pending, batch_start)
+        stage_seconds.observe(time.perf_counter() - batch_start, stage="batch_total")
+
+    def stream():
+        try:
+            yield from generate()
+        finally:
+            # client 가 연결을 끊은 경우 아직 읽지 않은 임시 파일 정리
+            for file in files:
+                file.close()
+
+    return Response(stream_with_context(stream()), mimetype="application/x-ndjson", headers={"X-Batch-Id": batch_id})
+
+# Prometheus 형식 단계별 지연 시간 / 분기 / 외부 api 오류
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    res = make_response(render_metrics())
+    res.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return res
+
+# 저장된 요청 프로파일 목록 / 다운로드 (X-Admin-Token 필요)
+@app.route('/admin/profiles', methods=['GET'])
+def profiles():
+    if not admin_allowed():
+        return make_response("Not Found", 404)
+    res = make_response(json.dumps(list_profiles(), ensure_ascii=False))
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+@app.route('/admin/profiles/<name>', methods=['GET'])
+def profile_download(name):
+    if not admin_allowed():
+        return make_response("Not Found", 404)
+    path = profile_path(name)
+    if path is None:
+        return make_response("Not Found", 404)
+    # ?format=text 이면 pstats 요약, 아니면 snakeviz 등에서 열 수 있는 .prof 원본
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in SORT_KEYS:
+            return make_response(f"invalid sort: {sort} (use one of {', '.join(SORT_KEYS)})", 400)
+        res = make_response(profile_text(path, sort=sort))
+        res.headers['Content-Type'] = 'text/plain; charset=utf-8'
+        return res
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+# 결과 캐시 hit / miss 확인
+@app.route('/cache/stats', methods=['GET'])
+def cache_statistics():
+    res = make_response(json.dumps({**cache_stats(), "nutrition": nutrition_store.stats()}, ensure_ascii=False))
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+# liveness - 프로세스가 요청을 받을 수 있으면 200 (모델 로드 실패 시 재시작되도록 503)
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    res = make_response(json.dumps({"status": "failed" if startup.failed else "ok"}), 503 if startup.failed else 200)
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+# readiness - 모델 로드 + warmup 이 끝난 뒤에만 200 (그 전에는 트래픽을 받지 않도록 503)
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    res = make_response(json.dumps(startup.status(), ensure_ascii=False), 200 if startup.ready else 503)
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+# 모델 로드 시간 및 메모리 사용량 확인
+@app.route('/models', methods=['GET'])
+def models():
+    res = make_response(json.dumps({"models": model_stats(), "process": process_memory(), "labels": label_index.stats()},
+                                   ensure_ascii=False))
+    res.headers['Content-Type'] = 'application/json'
+    return res
     
+# 모든 route 등록 후 모델 로드 / warmup 시작 (BP_BACKGROUND_STARTUP=0 이면 여기서 완료될 때까지 대기)
+startup.start()
+
 if __name__=="__main__":
-    app.run(host="0.0.0.0",debug=True)
+    # 개발용 단일 프로세스 서버 - 운영에서는 gunicorn -c gunicorn.conf.py model_api:app (모델 공유 multi-process)
+    # debug reloader 는 프로세스를 한 번 더 띄워 모델을 두 번 로드하므로 사용하지 않음
+    app.run(host="0.0.0.0",debug=True,use_reloader=False)
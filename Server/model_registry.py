@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from config import env_setting
+from onnx_backend import backend_weight
+
+# 서버에서 사용하는 학습 모델 가중치 (프로세스 시작 시 한 번만 로드)
+# BP_MODEL_WEIGHTS 환경 변수(콤마 구분)로 변경 가능
+MODEL_WEIGHTS = [
+    "../weights/yolov8m_train.pt",
+    "../weights/yolov5mu_train.pt"
+    # "../BP_OB_Model/runs/detect/train9/weights/best.pt",
+    # "../BP_OB_Model/runs/detect/train2/weights/best.pt",
+    # "../BP_OB_Model/runs/detect/train13/weights/best.pt"
+    ]
+if os.environ.get("BP_MODEL_WEIGHTS"):
+    MODEL_WEIGHTS = [weight.strip() for weight in os.environ["BP_MODEL_WEIGHTS"].split(",") if weight.strip()]
+
+# 추론 backend (onnx_backend.py 로 미리 변환한 파일을 사용)
+#   torch : .pt (PyTorch)
+#   onnx / onnx-int8 : <weight>.onnx / <weight>.int8.onnx (ONNX Runtime CPU)
+MODEL_BACKEND = os.environ.get("BP_MODEL_BACKEND", "torch")
+
+# 프로세스별 torch intra-op thread 수 (0 = torch 기본값, 코어 수)
+# 여러 worker 프로세스로 실행할 때 workers x threads 가 코어 수를 넘지 않도록 설정
+TORCH_THREADS = env_setting("BP_TORCH_THREADS", 0)
+
+_models = {}
+_model_stats = {}
+_registry_lock = threading.Lock()
+
+
+def set_torch_threads(threads=TORCH_THREADS):
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _rss_bytes():
+    # 현재 프로세스의 상주 메모리(RSS)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelHandle:
+    # 여러 요청 스레드가 공유하는 추론 핸들
+    # ultralytics predictor 는 스레드 안전하지 않으므로 모델별 lock 으로 추론을 직렬화
+    def __init__(self, weight, model):
+        self.weight = weight
+        self.model = model
+        self._lock = threading.Lock()
+        # 이미지 한 장당 추론 시간 이동 평균 (초) - cascade 에서 빠른 모델을 먼저 실행하는 데 사용
+        self.latency = None
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, img, **kwargs):
+        kwargs.setdefault("verbose", False)
+        with self._lock:
+            start = time.perf_counter()
+            results = self.model.predict(img, **kwargs)
+            elapsed = (time.perf_counter() - start) / max(1, len(results))
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+            return results
+
+
+def load_model(weight, backend=None):
+    # handle.weight 는 실제로 로드한 파일 경로 (탐지 결과 cache key 도 backend 별로 분리됨)
+    weight = backend_weight(weight, backend or MODEL_BACKEND)
+    with _registry_lock:
+        if weight in _models:
+            return _models[weight]
+
+        # torch / ultralytics 는 import 만으로 수 초가 걸리므로 실제로 모델을 로드할 때 import
+        from ultralytics import YOLO
+        set_torch_threads()
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = YOLO(weight, task="detect")
+        load_time = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        handle = ModelHandle(weight, model)
+        _models[weight] = handle
+        _model_stats[weight] = {
+            "load_time_sec": round(load_time, 4),
+            "rss_delta_mb": round((rss_after - rss_before) / (1024 * 1024), 2),
+            "process_rss_mb": round(rss_after / (1024 * 1024), 2),
+            "num_classes": len(model.names),
+            "backend": backend or MODEL_BACKEND,
+        }
+        print("@model-registry loaded", weight, _model_stats[weight])
+        return handle
+
+
+def load_models(weights=None):
+    weights = MODEL_WEIGHTS if weights is None else weights
+    return [load_model(weight) for weight in weights]
+
+
+def get_models(weights=None):
+    # 이미 로드된 모델은 그대로 공유, 없는 모델만 로드
+    return load_models(weights)
+
+
+def model_stats():
+    with _registry_lock:
+        stats = {weight: dict(values) for weight, values in _model_stats.items()}
+    for weight, values in stats.items():
+        latency = _models[weight].latency
+        values["latency_ms"] = None if latency is None else round(latency * 1000, 2)
+    return stats
+
+
+def process_memory():
+    # fork 된 worker 끼리 공유하는 메모리(copy-on-write 모델 가중치 등) 확인용
+    #   pss : 공유 페이지를 공유한 프로세스 수로 나눈 값 (worker 들의 pss 합계 = 실제 사용량)
+    stats = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    stats[key.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 2)
+    except (OSError, ValueError, IndexError):
+        stats["rss_mb"] = round(_rss_bytes() / (1024 * 1024), 2)
+    stats["pid"] = os.getpid()
+    return stats
@@ -0,0 +1,264 @@
+import argparse
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+from config import env_setting
+
+# 음식별 영양 정보 저장소 (KT prediction_top1 형식: food_code, food_cal, food_nat, food_carbs ...)
+#   - KT 응답이 올 때마다 기록 (같은 값이면 쓰지 않음, DB 기록은 background thread)
+#   - SQLite 파일에 저장하고, 서버 시작(startup) 시 전체를 메모리 dict 로 읽어서 조회는 dict 한 번 (요청 중 DB 조회 없음)
+#   - 음식 코드 / 정규화한 이름 (공백 제거) 두 가지로 조회
+#   - CSV 일괄 등록 : python nutrition.py --load foods.csv (식품의약품안전처 식품영양성분 DB 컬럼명도 인식)
+#
+#   BP_NUTRITION_DB     : SQLite 파일 경로 (비어 있으면 메모리만 사용)
+#   BP_NUTRITION_CSV    : 시작할 때 등록할 CSV (비어 있으면 사용 안 함, 이미 있는 음식은 KT 값 유지)
+#   BP_NUTRITION_ATTACH : 1 이면 KT 가 영양 정보를 주지 않은 음식(로컬 모델만 찾은 음식)도 ktFoodsInfo 에 추가
+NUTRITION_DB = env_setting("BP_NUTRITION_DB", "../nutrition.db")
+NUTRITION_CSV = env_setting("BP_NUTRITION_CSV", "")
+NUTRITION_ATTACH = env_setting("BP_NUTRITION_ATTACH", True)
+
+NUTRITION_FIELDS = ("food_name", "food_code", "food_cal", "food_nat", "food_serving_size", "food_carbs",
+                    "food_protein", "food_fat", "food_sugar", "food_cholesterol")
+NUMBER_FIELDS = NUTRITION_FIELDS[2:]
+
+# CSV 컬럼명 -> 필드 (영문 필드명 그대로인 CSV 와 식품영양성분 DB 내려받기 파일)
+CSV_COLUMNS = {
+    "식품코드": "food_code",
+    "식품명": "food_name",
+    "에너지(kcal)": "food_cal",
+    "에너지(㎉)": "food_cal",
+    "나트륨(mg)": "food_nat",
+    "영양성분함량기준량": "food_serving_size",
+    "탄수화물(g)": "food_carbs",
+    "단백질(g)": "food_protein",
+    "지방(g)": "food_fat",
+    "당류(g)": "food_sugar",
+    "콜레스테롤(mg)": "food_cholesterol",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nutrition (
+    name_key TEXT PRIMARY KEY,
+    food_code TEXT,
+    food_name TEXT NOT NULL,
+    food_cal REAL, food_nat REAL, food_serving_size REAL, food_carbs REAL,
+    food_protein REAL, food_fat REAL, food_sugar REAL, food_cholesterol REAL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nutrition_food_code ON nutrition (food_code);
+"""
+
+
+def normalize_name(name):
+    # 공백 차이만 있는 이름은 같은 음식으로 취급
+    return "".join(str(name).split())
+
+
+def _number(value):
+    # "100g", "1,234.5" 같은 값도 숫자로 (없으면 None)
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).replace(",", "").strip()
+    digits = text.rstrip("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ㎉㎎㎖ ")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def _entry(info):
+    entry = {field: info[field].strip() if isinstance(info[field], str) else info[field]
+             for field in NUTRITION_FIELDS if info.get(field) not in (None, "")}
+    for field in NUMBER_FIELDS:
+        if field in entry:
+            entry[field] = _number(entry[field])
+    return entry
+
+
+class NutritionStore:
+    # 만들 때는 파일을 열지 않음 - 서버는 startup 에서 open(), 그 외에는 처음 사용할 때 open
+    def __init__(self, path=NUTRITION_DB, csv_path=NUTRITION_CSV):
+        self.path = path
+        self.csv_path = csv_path
+        self._by_name = {}
+        self._by_code = {}
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self._conn = None
+        self._pid = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "write_errors": 0}
+        # KT 응답으로 바뀐 항목은 background thread 가 DB 에 기록 (요청 처리 / 조회가 디스크를 기다리지 않음)
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_pid = None
+
+    def open(self):
+        with self._open_lock:
+            if self._opened:
+                return self
+            self._load()
+            self._opened = True
+        if self.csv_path:
+            self.load_csv(self.csv_path)
+            # fork 전에 (gunicorn preload) CSV 기록을 끝냄
+            self.flush()
+        return self
+
+    def _connection(self):
+        # fork 된 worker 는 부모의 연결을 쓰지 않고 새로 연결 (gunicorn preload)
+        if not self.path:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _remember_entry(self, entry):
+        key = normalize_name(entry["food_name"])
+        # 음식 코드가 바뀐 경우 이전 코드로는 더 이상 조회되지 않도록
+        previous = self._by_name.get(key)
+        if previous is not None and previous.get("food_code") and previous.get("food_code") != entry.get("food_code"):
+            if self._by_code.get(previous["food_code"]) is previous:
+                del self._by_code[previous["food_code"]]
+        self._by_name[key] = entry
+        if entry.get("food_code"):
+            self._by_code[entry["food_code"]] = entry
+
+    def _load(self):
+        conn = self._connection()
+        if conn is None:
+            return
+        rows = conn.execute(f"SELECT {', '.join(NUTRITION_FIELDS)} FROM nutrition").fetchall()
+        with self._lock:
+            for row in rows:
+                self._remember_entry({field: value for field, value in zip(NUTRITION_FIELDS, row) if value is not None})
+        print(f"@nutrition loaded {len(self._by_name)} foods from {self.path}")
+
+    def _write(self, entries, source):
+        conn = self._connection()
+        if conn is None or not entries:
+            return
+        columns = ("name_key",) + NUTRITION_FIELDS + ("source", "updated_at")
+        now = time.time()
+        rows = [(normalize_name(entry["food_name"]),) + tuple(entry.get(field) for field in NUTRITION_FIELDS)
+                + (source, now) for entry in entries]
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO nutrition ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+        self._stats["writes"] += len(rows)
+
+    def _write_loop(self):
+        while True:
+            entries, source = self._queue.get()
+            try:
+                self._write(entries, source)
+            except sqlite3.Error as error:
+                self._stats["write_errors"] += 1
+                print("@nutrition write failed:", error)
+            finally:
+                self._queue.task_done()
+
+    def _submit(self, entries, source):
+        if not self.path or not entries:
+            return
+        self._queue.put((entries, source))
+        # fork 된 worker 에는 부모의 thread 가 없으므로 다시 시작
+        if self._writer is None or self._writer_pid != os.getpid() or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="bp-nutrition-writer", daemon=True)
+            self._writer.start()
+            self._writer_pid = os.getpid()
+
+    def flush(self):
+        # 대기 중인 기록이 DB 에 반영될 때까지 대기
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+
+    def update(self, infos, source="kt", overwrite=True):
+        # 바뀐 음식만 메모리에 바로 반영하고 DB 기록은 background 로 (overwrite=False 이면 없는 음식만 추가)
+        self.open()
+        changed = []
+        with self._lock:
+            for info in infos:
+                if not info.get("food_name"):
+                    continue
+                entry = _entry(info)
+                # 영양 정보가 하나도 없는 항목은 저장하지 않음
+                if not any(entry.get(field) is not None for field in NUMBER_FIELDS):
+                    continue
+                current = self._by_name.get(normalize_name(entry["food_name"]))
+                if current == entry or (current is not None and not overwrite):
+                    continue
+                self._remember_entry(entry)
+                changed.append(entry)
+        self._submit(changed, source)
+        return len(changed)
+
+    def remember(self, food_api_result):
+        # food_api 결과의 {region: prediction_top1} 에서 영양 정보만 보관
+        self.update(food_api_result.values(), source="kt")
+
+    def lookup(self, name=None, code=None):
+        # 음식 코드가 있으면 코드로, 없으면 정규화한 이름으로 조회
+        if not self._opened:
+            self.open()
+        with self._lock:
+            info = self._by_code.get(code) if code else None
+            if info is None and name is not None:
+                info = self._by_name.get(normalize_name(name))
+            self._stats["hits" if info is not None else "misses"] += 1
+        return dict(info) if info is not None else None
+
+    def load_csv(self, path, overwrite=False):
+        # utf-8 (BOM 포함) / cp949 CSV 모두 지원
+        for encoding in ("utf-8-sig", "cp949"):
+            try:
+                with open(path, newline="", encoding=encoding) as f:
+                    rows = list(csv.DictReader(f))
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError(f"unsupported CSV encoding: {path}")
+        infos = [{CSV_COLUMNS.get(column.strip(), column.strip()): value for column, value in row.items() if column}
+                 for row in rows]
+        added = self.update(infos, source=f"csv:{os.path.basename(path)}", overwrite=overwrite)
+        print(f"@nutrition {path}: {len(rows)} rows, {added} updated")
+        return added
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "opened": self._opened, "foods": len(self._by_name),
+                    "codes": len(self._by_code), "pending_writes": self._queue.qsize(), **self._stats}
+
+
+nutrition_store = NutritionStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load nutrition rows into the local nutrition store")
+    parser.add_argument("--load", nargs="*", default=[], help="등록할 CSV 파일")
+    parser.add_argument("--overwrite", action="store_true", help="이미 있는 음식도 CSV 값으로 변경")
+    parser.add_argument("--lookup", nargs="*", default=[], help="조회할 음식 이름")
+    args = parser.parse_args()
+    nutrition_store.open()
+    for path in args.load:
+        nutrition_store.load_csv(path, overwrite=args.overwrite)
+    for name in args.lookup:
+        print(name, nutrition_store.lookup(name))
+    nutrition_store.flush()
+    print(nutrition_store.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+# PyTorch 학습 가중치(.pt) -> ONNX 변환 / INT8 정적 양자화 / 정확도 및 속도 비교
+#
+# 서버에서 사용 (model_registry.py)
+#   BP_MODEL_BACKEND=torch      : .pt 그대로 사용 (기본)
+#   BP_MODEL_BACKEND=onnx       : <weight>.onnx 사용 (ONNX Runtime CPU)
+#   BP_MODEL_BACKEND=onnx-int8  : <weight>.int8.onnx 사용
+#
+# 변환 (Server 폴더에서)
+#   python onnx_backend.py --int8                                   # MODEL_WEIGHTS 변환 + 양자화 + 비교 리포트
+#   python onnx_backend.py --runs "../BP_OB_Model/runs/detect/*/weights/best.pt" --int8
+#   python onnx_backend.py --report-only --report onnx_report.json
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# INT8 보정 / 정확도 비교 이미지 - 보정에 사용한 이미지는 비교에 사용하지 않음
+#   img_file/            : 파일 이름 hash 로 나누어 HOLDOUT_FRACTION 만큼은 비교용, 나머지는 보정용
+#   BP_Api_File/test_img/ : 비교에만 사용
+SAMPLE_GLOB = os.path.join(ROOT_DIR, "img_file", "*.jpg")
+EVAL_ONLY_GLOB = os.path.join(ROOT_DIR, "BP_Api_File", "test_img", "*.jpg")
+HOLDOUT_FRACTION = 0.3
+EXPORT_IMGSZ = 640
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def onnx_path(weight, int8=False):
+    base, _ = os.path.splitext(weight)
+    return base + (".int8.onnx" if int8 else ".onnx")
+
+
+def backend_weight(weight, backend):
+    # backend 에 맞는 가중치 파일 경로
+    if backend == "torch" or weight.endswith(".onnx"):
+        return weight
+    if backend == "onnx":
+        return onnx_path(weight)
+    if backend == "onnx-int8":
+        return onnx_path(weight, int8=True)
+    raise ValueError(f"Unknown model backend: {backend} (choose from {', '.join(BACKENDS)})")
+
+
+def split_images(paths, holdout=HOLDOUT_FRACTION):
+    # (보정용, 비교용) - 이미지를 추가해도 기존 이미지의 구분이 바뀌지 않도록 파일 이름 hash 로 나눔
+    calibration, held_out = [], []
+    for path in paths:
+        bucket = hashlib.sha1(os.path.basename(path).encode("utf-8")).digest()[0] / 256
+        (held_out if bucket < holdout else calibration).append(path)
+    return calibration, held_out
+
+
+def letterbox(path, imgsz=EXPORT_IMGSZ):
+    # ultralytics LetterBox 와 같은 전처리 (비율 유지 resize + 114 padding, RGB, 0~1, NCHW)
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        width, height = img.size
+        ratio = min(imgsz / width, imgsz / height)
+        new_width, new_height = round(width * ratio), round(height * ratio)
+        resized = img.resize((new_width, new_height), Image.BILINEAR)
+    canvas = Image.new("RGB", (imgsz, imgsz), (114, 114, 114))
+    canvas.paste(resized, ((imgsz - new_width) // 2, (imgsz - new_height) // 2))
+    array = np.asarray(canvas, dtype=np.float32) / 255.0
+    return array.transpose(2, 0, 1)[None]
+
+
+def export_onnx(weight, imgsz=EXPORT_IMGSZ):
+    from ultralytics import YOLO
+    exported = YOLO(weight).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    target = onnx_path(weight)
+    if os.path.abspath(exported) != os.path.abspath(target):
+        os.replace(exported, target)
+    print("@onnx exported", weight, "->", target)
+    return target
+
+
+def _head_nodes(model):
+    # 검출 head(마지막 model.N 모듈)는 양자화 오차가 크므로 FP32 로 유지
+    indices = []
+    for node in model.graph.node:
+        parts = node.name.split("/")
+        if len(parts) > 1 and parts[1].startswith("model.") and parts[1][6:].isdigit():
+            indices.append(int(parts[1][6:]))
+    if not indices:
+        return []
+    head = f"/model.{max(indices)}/"
+    return [node.name for node in model.graph.node if node.name.startswith(head)]
+
+
+def quantize_int8(fp32_path, calibration_images, imgsz=EXPORT_IMGSZ, exclude_head=True, max_images=64):
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        def __init__(self, input_name, paths):
+            self.input_name = input_name
+            self.paths = iter(paths)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {self.input_name: letterbox(path, imgsz)}
+
+    model = onnx.load(fp32_path)
+    input_name = model.graph.input[0].name
+    exclude = _head_nodes(model) if exclude_head else []
+    target = fp32_path.replace(".onnx", ".int8.onnx")
+    quantize_static(
+        fp32_path, target,
+        ImageCalibrationReader(input_name, calibration_images[:max_images]),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=exclude,
+    )
+    # ultralytics 가 읽는 metadata(names, stride, imgsz)를 양자화 모델에도 복사
+    quantized = onnx.load(target)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, target)
+    print(f"@onnx quantized {fp32_path} -> {target} (calibration images: {min(len(calibration_images), max_images)}, "
+          f"fp32 head nodes: {len(exclude)})")
+    return target
+
+
+def _iou(box, boxes):
+    xA = np.maximum(boxes[:, 0], box[0])
+    yA = np.maximum(boxes[:, 1], box[1])
+    xB = np.minimum(boxes[:, 2], box[2])
+    yB = np.minimum(boxes[:, 3], box[3])
+    inter = np.maximum(xB - xA, 0) * np.maximum(yB - yA, 0)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + (box[2] - box[0]) * (box[3] - box[1]) - inter + 1e-9)
+
+
+def compare_detections(reference, candidate, iou_thr=0.5):
+    # 같은 클래스 + IoU 기준으로 PyTorch 결과와 일치하는 박스 수 계산
+    matched, conf_diffs = 0, []
+    used = np.zeros(len(candidate["cls"]), dtype=bool)
+    cand_boxes = np.asarray(candidate["xyxy"], dtype=np.float64).reshape(-1, 4)
+    for box, cls, conf in zip(reference["xyxy"], reference["cls"], reference["conf"]):
+        if not len(cand_boxes):
+            break
+        ious = _iou(np.asarray(box), cand_boxes)
+        ious[(np.asarray(candidate["cls"]) != cls) | used] = -1
+        best = int(np.argmax(ious))
+        if ious[best] >= iou_thr:
+            used[best] = True
+            matched += 1
+            conf_diffs.append(abs(candidate["conf"][best] - conf))
+    return matched, conf_diffs
+
+
+def _detections(model, array):
+    result = model.predict(array, verbose=False)[0]
+    boxes = result.boxes
+    return {"xyxy": boxes.xyxy.cpu().tolist(), "conf": boxes.conf.cpu().tolist(), "cls": boxes.cls.cpu().int().tolist()}
+
+
+def benchmark_report(weights, images, backends=BACKENDS, repeat=3):
+    from ultralytics import YOLO
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from image_context import ImageContext
+
+    arrays = [ImageContext(open(path, "rb").read()).array for path in images]
+    report = {}
+    for weight in weights:
+        # 처음 측정한 backend 가 기준 (torch .pt 가 없으면 다음 backend) - 출력과 중앙값을 함께 보관
+        reference, reference_backend, reference_ms = None, None, None
+        report[weight] = {}
+        for backend in backends:
+            path = backend_weight(weight, backend)
+            if not os.path.exists(path):
+                print("@onnx skip missing", path)
+                continue
+            model = YOLO(path, task="detect")
+            _detections(model, arrays[0])  # warmup
+            timings, outputs = [], []
+            for array in arrays:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    output = _detections(model, array)
+                    timings.append((time.perf_counter() - start) * 1000)
+                outputs.append(output)
+
+            entry = {
+                "path": path,
+                "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+                "median_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1], 2),
+                "detections": sum(len(output["cls"]) for output in outputs),
+            }
+            if reference is None:
+                reference, reference_backend, reference_ms = outputs, backend, entry["median_ms"]
+            else:
+                entry["reference"] = reference_backend
+                matched, conf_diffs, ref_total, cand_total = 0, [], 0, 0
+                for ref_output, output in zip(reference, outputs):
+                    image_matched, image_diffs = compare_detections(ref_output, output)
+                    matched += image_matched
+                    conf_diffs += image_diffs
+                    ref_total += len(ref_output["cls"])
+                    cand_total += len(output["cls"])
+                entry["recall_vs_reference"] = round(matched / ref_total, 4) if ref_total else 1.0
+                entry["precision_vs_reference"] = round(matched / cand_total, 4) if cand_total else 1.0
+                entry["mean_conf_diff"] = round(float(np.mean(conf_diffs)), 4) if conf_diffs else 0.0
+                entry["speedup_vs_reference"] = round(reference_ms / entry["median_ms"], 2)
+            report[weight][backend] = entry
+            print(f"@onnx {os.path.basename(path)}: {entry}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLO weights to ONNX, quantize to INT8 and compare")
+    parser.add_argument("--weights", nargs="*", default=None, help="변환할 .pt (기본값: model_registry.MODEL_WEIGHTS)")
+    parser.add_argument("--runs", default=None, help="BP_OB_Model 학습 결과 glob (예: ../BP_OB_Model/runs/detect/*/weights/best.pt)")
+    parser.add_argument("--imgsz", type=int, default=EXPORT_IMGSZ)
+    parser.add_argument("--int8", action="store_true", help="img_file/ 의 보정용 이미지로 보정한 INT8 정적 양자화 모델도 생성")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT_FRACTION,
+                        help="img_file/ 중 보정에 쓰지 않고 비교에만 쓰는 비율")
+    parser.add_argument("--quantize-head", action="store_true", help="검출 head 까지 INT8 로 양자화")
+    parser.add_argument("--report", default="onnx_report.json")
+    parser.add_argument("--report-only", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    weights = list(args.weights or [])
+    if args.runs:
+        weights += sorted(glob.glob(args.runs))
+    if not weights:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from model_registry import MODEL_WEIGHTS
+        weights = list(MODEL_WEIGHTS)
+
+    calibration_images, held_out = split_images(sorted(glob.glob(SAMPLE_GLOB)), args.holdout)
+    eval_images = held_out + sorted(glob.glob(EVAL_ONLY_GLOB))
+    print(f"@onnx calibration images: {len(calibration_images)}, evaluation images: {len(eval_images)} "
+          f"({len(held_out)} held out from img_file/)")
+    if not args.report_only:
+        for weight in weights:
+            fp32_path = export_onnx(weight, args.imgsz)
+            if args.int8:
+                quantize_int8(fp32_path, calibration_images, args.imgsz, exclude_head=not args.quantize_head)
+
+    report = benchmark_report(weights, eval_images, repeat=args.repeat)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print("Report saved:", args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+import uuid
+from flask import request
+from config import env_setting
+
+# 운영 중 요청 단위 cProfile
+#   BP_PROFILE_EVERY_N : N 번째 요청마다 1 번 프로파일링 (0 = 사용 안 함)
+#   BP_PROFILE_TOKEN   : 요청 헤더 X-Profile: <token> 이 일치하면 프로파일링,
+#                        관리자 endpoint 는 헤더 X-Admin-Token: <token> 필요 (비어 있으면 둘 다 사용 안 함)
+#   BP_PROFILE_DIR     : .prof 파일 저장 경로
+#   BP_PROFILE_KEEP    : 보관할 최대 파일 수 (오래된 것부터 삭제)
+#
+# cProfile 은 스레드 단위로 동작하므로 fan-out thread pool 에 넘기는 작업은 profiled() 로 감싸서
+# 각 작업의 결과를 요청 하나의 프로파일로 합침 (ultralytics / WBF 시간 포함)
+PROFILE_EVERY_N = env_setting("BP_PROFILE_EVERY_N", 0)
+PROFILE_TOKEN = env_setting("BP_PROFILE_TOKEN", "")
+PROFILE_DIR = env_setting("BP_PROFILE_DIR", "profiles")
+PROFILE_KEEP = env_setting("BP_PROFILE_KEEP", 50)
+
+_request_counter = itertools.count(1)
+_local = threading.local()
+
+
+class ProfileSession:
+    def __init__(self, reason):
+        self.profile_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.reason = reason
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 다른 profiler 가 이미 동작 중인 경우 (Python 3.12+ 에서 동시 요청 등) 프로파일 없이 실행
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def save(self, directory=PROFILE_DIR):
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.profile_id}.prof")
+        stats.dump_stats(path)
+        _prune(directory)
+        print("@profile saved", path, self.reason)
+        return path
+
+
+def _prune(directory):
+    files = sorted(list_profiles(directory), key=lambda item: item["mtime"])
+    for item in files[:max(0, len(files) - PROFILE_KEEP)]:
+        try:
+            os.remove(os.path.join(directory, item["name"]))
+        except OSError:
+            pass
+
+
+def _should_profile():
+    if PROFILE_TOKEN and request.headers.get("X-Profile") == PROFILE_TOKEN:
+        return "header"
+    if PROFILE_EVERY_N > 0 and next(_request_counter) % PROFILE_EVERY_N == 0:
+        return "sampled"
+    return None
+
+
+def current_session():
+    return getattr(_local, "session", None)
+
+
+def profiled(fn):
+    # thread pool 로 넘기는 작업을 현재 요청의 프로파일에 포함
+    session = current_session()
+    if session is None:
+        return fn
+    return functools.partial(session.run, fn)
+
+
+def profile_request(view):
+    # Flask view 전체를 프로파일링 (샘플링 / 헤더 조건을 만족하는 요청만)
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        reason = _should_profile()
+        if reason is None:
+            return view(*args, **kwargs)
+        session = ProfileSession(reason)
+        _local.session = session
+        try:
+            response = session.run(view, *args, **kwargs)
+        finally:
+            _local.session = None
+            try:
+                session.save()
+            except OSError as error:
+                print("@profile save failed:", error)
+        response.headers["X-Profile-Id"] = session.profile_id
+        return response
+    return wrapper
+
+
+def list_profiles(directory=PROFILE_DIR):
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith(".prof"):
+            continue
+        stat = os.stat(os.path.join(directory, name))
+        profiles.append({"name": name, "size": stat.st_size, "mtime": stat.st_mtime})
+    return sorted(profiles, key=lambda item: item["mtime"], reverse=True)
+
+
+def profile_path(name, directory=PROFILE_DIR):
+    # 파일 이름만 허용 (경로 조작 방지)
+    if os.path.basename(name) != name or not name.endswith(".prof"):
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
+
+
+# ?sort= 로 받을 수 있는 pstats 정렬 기준 (SortKey 값 + tottime / cumtime / ncalls 같은 pstats 별칭)
+SORT_KEYS = sorted({key.value for key in pstats.SortKey} | set(pstats.Stats.sort_arg_dict_default))
+
+
+def profile_text(path, sort="cumulative", limit=60):
+    stream = io.StringIO()
+    pstats.Stats(path, stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def admin_allowed():
+    return bool(PROFILE_TOKEN) and request.headers.get("X-Admin-Token") == PROFILE_TOKEN
@@ -0,0 +1,162 @@
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import statistics
+import time
+from PIL import Image, ImageDraw, ImageFont
+from receipt_router import RECEIPT_LOW, RECEIPT_HIGH, receipt_features, receipt_score, route_for
+
+# 영수증 분류기 오프라인 평가 (서버 / 외부 api 없이 실행)
+#   python receipt_eval.py                                # held-out 이미지(../receipt_eval/) 평가
+#   python receipt_eval.py --holdout /data/receipt_eval   # 다른 held-out 폴더
+#   python receipt_eval.py --synthetic 20                 # 합성 영수증 이미지 추가 (실제 영수증 수에는 포함하지 않음)
+#   python receipt_eval.py --low 0.1 --high 0.95          # 기준값 변경
+#   python receipt_eval.py --dev                          # 점수 가중치를 맞춘 이미지로 평가 (참고용)
+#
+# held-out 폴더 : receipt/ 에 영수증, food/ 에 음식 사진 (jpg / png)
+#   receipt_router 의 가중치 / 기준값을 맞출 때 보지 않은 이미지여야 하고, 실제 영수증이 --min-receipts 장 이상 필요
+#   dev 이미지(img_file/ + BP_Api_File/test_img/)는 가중치를 맞춘 이미지이고 영수증이 1 장뿐이라 결과가 낙관적
+#
+# 음식 사진이 "receipt" 로 분류되면 OCR 호출 후 탐지로 넘어가므로 시간만 손해
+# 영수증이 "food" 로 분류되면 OCR 을 호출하지 않아 결과가 틀림 -> receipt_as_food 는 0 이어야 함
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOLDOUT_DIR = os.path.join(ROOT_DIR, "receipt_eval")
+MIN_HOLDOUT_RECEIPTS = 5
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEV_GLOBS = [
+    os.path.join(ROOT_DIR, "img_file", "*.jpg"),
+    os.path.join(ROOT_DIR, "BP_Api_File", "test_img", "*.jpg"),
+]
+# dev 정답 : 여기 있는 파일만 영수증, 나머지는 음식 사진
+DEV_RECEIPT_FILES = {"not_food_test_.jpg"}
+
+SWEEP_LOW = [0.05, 0.1, 0.2, 0.3]
+SWEEP_HIGH = [0.7, 0.8, 0.9, 0.95]
+
+
+def synthetic_receipt(seed):
+    # 밝은 종이 + 품목 / 금액 줄, 종이 바깥으로 채도 낮은 배경(책상 등)이 보이도록 배치
+    rng = random.Random(seed)
+    width, height = rng.choice([(1080, 1440), (1440, 1080), (900, 1600)])
+    gray = rng.randint(60, 180)
+    background = tuple(min(255, gray + rng.randint(0, 30)) for _ in range(3))
+    img = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=rng.randint(22, 34))
+    margin_x, margin_y = int(width * rng.uniform(0.05, 0.2)), int(height * rng.uniform(0.02, 0.1))
+    paper = tuple(rng.randint(225, 250) for _ in range(3))
+    draw.rectangle((margin_x, margin_y, width - margin_x, height - margin_y), fill=paper)
+    y = margin_y + 40
+    while y < height - margin_y - 60:
+        name = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ ") for _ in range(rng.randint(6, 18)))
+        price = f"{rng.randint(1, 99) * 100:,}"
+        draw.text((margin_x + 40, y), name, fill=(20, 20, 20), font=font)
+        draw.text((width - margin_x - 160, y), price, fill=(20, 20, 20), font=font)
+        y += font.size + rng.randint(8, 30)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _read_sample(path, receipt):
+    with open(path, "rb") as f:
+        return os.path.relpath(path, ROOT_DIR), f.read(), receipt
+
+
+def load_dev_samples():
+    return [_read_sample(path, os.path.basename(path) in DEV_RECEIPT_FILES)
+            for pattern in DEV_GLOBS for path in sorted(glob.glob(pattern))]
+
+
+def load_holdout_samples(directory):
+    # 정답은 폴더 이름 (receipt / food)
+    return [_read_sample(path, label == "receipt")
+            for label in ("receipt", "food")
+            for path in sorted(glob.glob(os.path.join(directory, label, "*")))
+            if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS]
+
+
+def synthetic_samples(count):
+    return [(f"synthetic/receipt_{seed:03d}.jpg", synthetic_receipt(seed), True) for seed in range(count)]
+
+
+def summarize(rows, low, high):
+    routes = [(row["receipt"], route_for(row["score"], low, high)) for row in rows]
+    food = sum(1 for receipt, _ in routes if not receipt)
+    receipts = len(routes) - food
+    return {
+        "low": low,
+        "high": high,
+        "food_as_food": sum(1 for receipt, route in routes if not receipt and route == "food"),
+        "food_as_both": sum(1 for receipt, route in routes if not receipt and route == "both"),
+        "food_as_receipt": sum(1 for receipt, route in routes if not receipt and route == "receipt"),
+        "receipt_as_receipt": sum(1 for receipt, route in routes if receipt and route == "receipt"),
+        "receipt_as_both": sum(1 for receipt, route in routes if receipt and route == "both"),
+        "receipt_as_food": sum(1 for receipt, route in routes if receipt and route == "food"),
+        # 기존에는 모든 이미지에 OCR 호출 -> food 로 분류된 이미지만큼 절약
+        "ocr_calls_saved": round(sum(1 for _, route in routes if route == "food") / max(len(routes), 1), 3),
+        # 영수증 이미지에서 KT / 탐지를 미리 시작하지 않게 된 비율
+        "receipt_fanout_saved": round(sum(1 for receipt, route in routes if receipt and route == "receipt")
+                                      / max(receipts, 1), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local receipt / food router")
+    parser.add_argument("--low", type=float, default=RECEIPT_LOW)
+    parser.add_argument("--high", type=float, default=RECEIPT_HIGH)
+    parser.add_argument("--holdout", default=HOLDOUT_DIR, help="held-out 이미지 폴더 (receipt/, food/)")
+    parser.add_argument("--min-receipts", type=int, default=MIN_HOLDOUT_RECEIPTS,
+                        help="held-out 폴더에 필요한 최소 실제 영수증 수")
+    parser.add_argument("--dev", action="store_true", help="held-out 대신 가중치를 맞춘 dev 이미지로 평가 (참고용)")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 영수증 이미지 수")
+    parser.add_argument("--report", default=None, help="결과를 저장할 json 경로")
+    args = parser.parse_args()
+
+    if args.dev:
+        dataset, samples = "dev", load_dev_samples()
+        print("! dev 이미지로 평가 - 가중치를 맞춘 이미지이고 실제 영수증이 1 장뿐이라 held-out 결과가 아님")
+    else:
+        dataset, samples = "holdout", load_holdout_samples(args.holdout)
+    real_receipts = sum(1 for _, _, receipt in samples if receipt)
+    if dataset == "holdout" and (real_receipts < args.min_receipts or len(samples) == real_receipts):
+        parser.error(f"held-out set {args.holdout} has {real_receipts} receipt / {len(samples) - real_receipts} "
+                     f"food images (need at least {args.min_receipts} receipts and some food photos); "
+                     "add images under receipt/ and food/, or run with --dev for a dev-set reference")
+    samples += synthetic_samples(args.synthetic)
+
+    rows, latencies = [], []
+    for name, data, receipt in samples:
+        start = time.perf_counter()
+        features = receipt_features(data)
+        score = receipt_score(features)
+        latencies.append((time.perf_counter() - start) * 1000)
+        route = route_for(score, args.low, args.high)
+        rows.append({"image": name, "receipt": receipt, "score": round(score, 3), "route": route, **features})
+        wrong = (receipt and route == "food") or (not receipt and route == "receipt")
+        print(f"{'!' if wrong else ' '} {score:6.3f} {route:8s} {'receipt' if receipt else 'food':8s} {name}")
+
+    summary = {"dataset": dataset, "real_receipts": real_receipts, "synthetic_receipts": args.synthetic,
+               **summarize(rows, args.low, args.high)}
+    summary["latency_ms_median"] = round(statistics.median(latencies), 2)
+    summary["latency_ms_max"] = round(max(latencies), 2)
+    print(json.dumps(summary, indent=2))
+
+    print("low / high sweep (receipt_as_food 는 0 이어야 함)")
+    sweep = [summarize(rows, low, high) for low in SWEEP_LOW for high in SWEEP_HIGH if low < high]
+    for entry in sweep:
+        print(f"  low={entry['low']:.2f} high={entry['high']:.2f} ocr_saved={entry['ocr_calls_saved']:.3f} "
+              f"receipt_as_food={entry['receipt_as_food']} food_as_receipt={entry['food_as_receipt']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"summary": summary, "sweep": sweep, "images": rows}, f, indent=2)
+        print("Report saved:", args.report)
+
+
+if __name__ == "__main__":
+    main()
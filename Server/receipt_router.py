@@ -0,0 +1,98 @@
+import io
+import time
+import numpy as np
+from PIL import Image, ImageFilter
+from config import env_setting
+from metrics import Counter, stage_seconds
+
+# 영수증 / 음식 사진 사전 분류 (원격 api 호출 전에 로컬에서 판단)
+# 영수증 : 흰 종이(채도 낮고 밝은 영역)가 화면 대부분 + 종이 위에 가는 글자 획이 많음
+# 음식 사진 : 채도가 높고 종이 영역이 작음
+#
+#   BP_RECEIPT_ROUTER : 1 이면 사용 (0 = 항상 OCR 과 KT / 탐지를 모두 실행)
+#   BP_RECEIPT_LOW    : 영수증 점수가 이 값 미만이면 음식 사진 -> Clova OCR 호출 생략
+#   BP_RECEIPT_HIGH   : 이 값 이상이면 영수증 -> OCR 만 호출 (OCR 이 영수증이 아니라고 하면 KT / 탐지로 진행)
+#   그 사이 점수는 기존처럼 두 경로를 모두 실행
+#   평가 : python receipt_eval.py (held-out 이미지 필요)
+#
+# 주의 : 기준값 / 아래 가중치는 임시 값 (provisional)
+#   점수 가중치를 맞춘 이미지가 평가 이미지와 같고 실제 영수증은 1 장뿐이라 실제 오분류율은 아직 모름
+#   held-out 영수증 / 음식 사진으로 receipt_eval.py 를 실행해 확인하기 전까지 BP_RECEIPT_ROUTER 는 기본값(0) 유지
+RECEIPT_ROUTER = env_setting("BP_RECEIPT_ROUTER", False)
+RECEIPT_LOW = env_setting("BP_RECEIPT_LOW", 0.2)
+RECEIPT_HIGH = env_setting("BP_RECEIPT_HIGH", 0.9)
+ANALYSIS_SIDE = 512
+
+# 점수 = sigmoid(가중치 합) - img_file / BP_Api_File/test_img 로 맞춘 임시 값 (위 주의 참고)
+PAPER_WEIGHT, PAPER_CENTER = 8.0, 0.6
+SATURATION_WEIGHT, SATURATION_CENTER = 10.0, 0.15
+TEXT_WEIGHT, TEXT_CENTER = 1.0, 1.5
+
+receipt_route_total = Counter("bp_receipt_route_total", "Receipt router decisions", ("route",))
+
+
+def _small_image(data):
+    # JPEG 은 draft 로 1/2 ~ 1/8 크기로 바로 디코딩 (전체 디코딩 없이 분석)
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", (ANALYSIS_SIDE, ANALYSIS_SIDE))
+    img = img.convert("RGB")
+    img.thumbnail((ANALYSIS_SIDE, ANALYSIS_SIDE))
+    return img
+
+
+def _mask_image(mask):
+    return Image.fromarray(mask.astype(np.uint8) * 255)
+
+
+def receipt_features(data):
+    img = _small_image(data)
+    hsv = np.asarray(img.convert("HSV"), dtype=np.float32)
+    saturation, value = hsv[..., 1], hsv[..., 2]
+    gray_img = img.convert("L")
+    gray = np.asarray(gray_img, dtype=np.float32)
+    local = np.asarray(gray_img.filter(ImageFilter.BoxBlur(7)), dtype=np.float32)
+
+    # 종이 : 채도 낮고 밝은 픽셀, 글자 획을 포함하도록 주변까지 넓힌 영역
+    paper = (saturation < 40) & (value > 150)
+    paper_region = np.asarray(_mask_image(paper).filter(ImageFilter.BoxBlur(7))) > 127
+    # 글자 획 : 밝은 주변보다 어두운 가는 픽셀 (3x3 erosion 으로 남지 않는 경계 픽셀)
+    dark = (gray < local * 0.75) & (local > 120)
+    eroded = np.asarray(_mask_image(dark).filter(ImageFilter.MinFilter(3))) > 0
+    strokes = dark & ~eroded
+    return {
+        "paper_ratio": float(paper.mean()),
+        "saturation": float(saturation.mean() / 255),
+        "text_density": float((strokes & paper_region).sum() / max(paper_region.sum(), 1) * 100),
+    }
+
+
+def receipt_score(features):
+    z = (PAPER_WEIGHT * (features["paper_ratio"] - PAPER_CENTER)
+         + SATURATION_WEIGHT * (SATURATION_CENTER - features["saturation"])
+         + TEXT_WEIGHT * (features["text_density"] - TEXT_CENTER))
+    return float(1 / (1 + np.exp(-z)))
+
+
+def route_for(score, low=RECEIPT_LOW, high=RECEIPT_HIGH):
+    if score >= high:
+        return "receipt"
+    if score < low:
+        return "food"
+    return "both"
+
+
+def route_image(image, record=True):
+    # (경로, 점수) - 분석에 실패하면 기존처럼 두 경로 모두 실행
+    start = time.perf_counter()
+    try:
+        score = receipt_score(receipt_features(image.data))
+        route = route_for(score)
+    except Exception as error:
+        print("@receipt-router failed:", error)
+        score, route = None, "both"
+    elapsed = time.perf_counter() - start
+    if record:
+        stage_seconds.observe(elapsed, stage="receipt_router")
+        receipt_route_total.inc(route=route)
+        image.timings["receipt_router"] = round(elapsed * 1000, 3)
+    return route, score
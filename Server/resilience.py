@@ -0,0 +1,93 @@
+import threading
+import time
+from config import env_setting
+from metrics import circuit_state, circuit_transitions_total
+
+# 외부 api(KT / Clova) 장애가 서버 전체로 번지지 않도록 하는 도구
+#   Deadline       : 요청 하나에 허용된 전체 시간 - 단계별 timeout 을 남은 시간 안에서 계산
+#   CircuitBreaker : 연속 실패가 쌓이면 일정 시간 호출하지 않고 바로 실패 (open -> half-open 에서 1 건만 시험)
+#
+#   BP_REQUEST_DEADLINE : /predict 한 건의 전체 시간 (초)
+#   BP_OCR_BUDGET       : 그중 OCR 판정까지 기다리는 최대 시간 (넘으면 OCR 없이 음식 사진으로 처리)
+REQUEST_DEADLINE = env_setting("BP_REQUEST_DEADLINE", 20.0)
+OCR_BUDGET = env_setting("BP_OCR_BUDGET", 8.0)
+
+STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds=REQUEST_DEADLINE):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self, budget=None):
+        # 남은 시간 (budget 이 있으면 단계별 최대 시간과 비교하여 작은 값)
+        remaining = max(0.0, self.expires_at - time.monotonic())
+        return remaining if budget is None else min(remaining, budget)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        circuit_state.set(0, api=name)
+
+    def _transition(self, state):
+        if state != self.state:
+            print(f"@circuit {self.name}: {self.state} -> {state}")
+            circuit_transitions_total.inc(api=self.name, state=state)
+        self.state = state
+        circuit_state.set(STATE_VALUES[state], api=self.name)
+
+    def allow(self):
+        # 호출해도 되는지 확인 (open 상태에서 reset_timeout 이 지나면 시험 호출 1 건만 허용)
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition("half_open")
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition("closed")
+
+    def release(self):
+        # 결과를 판단하지 못한 호출 (다음 시험 호출 허용)
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition("open")
+
+    def status(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import env_setting
+
+# 업로드 이미지 hash 기반 결과 캐시
+#   BP_CACHE_MAX_ENTRIES    : 메모리 LRU 최대 개수 (캐시별)
+#   BP_CACHE_TTL            : 유효 시간(초)
+#   BP_CACHE_DIR            : 디스크 캐시 경로 (비어 있으면 메모리만 사용)
+#   BP_CACHE_DISK_MAX_BYTES : 디스크 캐시 최대 크기 (캐시별, 넘으면 오래된 파일부터 삭제 / 0 = 제한 없음)
+#   BP_CACHE_SWEEP_INTERVAL : 디스크 캐시 정리 주기(초) - 유효 시간이 지난 파일 삭제 + 크기 제한 적용
+CACHE_MAX_ENTRIES = env_setting("BP_CACHE_MAX_ENTRIES", 512)
+CACHE_TTL = env_setting("BP_CACHE_TTL", 6 * 60 * 60.0)
+CACHE_DIR = env_setting("BP_CACHE_DIR", "")
+CACHE_DISK_MAX_BYTES = env_setting("BP_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024)
+CACHE_SWEEP_INTERVAL = env_setting("BP_CACHE_SWEEP_INTERVAL", 10 * 60.0)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+class ResultCache:
+    # 값은 JSON 문자열로 저장하므로 조회할 때마다 새 객체를 돌려줌 (요청끼리 공유되지 않음)
+    def __init__(self, name, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, disk_dir=CACHE_DIR,
+                 disk_max_bytes=CACHE_DISK_MAX_BYTES, sweep_interval=CACHE_SWEEP_INTERVAL):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = os.path.join(disk_dir, name) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0,
+                       "disk_removed": 0, "disk_bytes": 0}
+        # 처음 set() 할 때 한 번 정리 (이전 실행에서 남은 파일 포함)
+        self._last_sweep = None
+        self._sweeping = False
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, name[:2], name + ".json")
+
+    def _remember(self, key, expires_at, payload):
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _get_memory(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return payload
+
+    def _get_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("key") != key:
+            return None
+        if record["expires_at"] < now:
+            self._count("expired")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        payload = record["payload"]
+        self._remember(key, record["expires_at"], payload)
+        self._count("disk_hits")
+        return payload
+
+    def get(self, key):
+        now = time.time()
+        payload = self._get_memory(key, now)
+        if payload is None:
+            payload = self._get_disk(key, now)
+        if payload is None:
+            self._count("misses")
+            return None
+        return json.loads(payload)
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        payload = json.dumps(value, ensure_ascii=False)
+        self._remember(key, expires_at, payload)
+        self._count("sets")
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"key": key, "expires_at": expires_at, "payload": payload}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as error:
+                print(f"@cache {self.name} disk write failed:", error)
+            self._maybe_sweep()
+
+    def sweep(self, now=None):
+        # 디스크 캐시 정리 - 유효 시간이 지난 파일을 지우고, 남은 크기가 disk_max_bytes 를 넘으면 오래된 파일부터 삭제
+        # (다른 키는 다시 조회되지 않으면 지워지지 않으므로 주기적으로 실행)
+        if not self.disk_dir:
+            return 0
+        now = time.time() if now is None else now
+        files, removed = [], 0
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # 파일은 set() 할 때 쓰므로 수정 시간 + ttl 이 만료 시간
+                if stat.st_mtime + self.ttl < now:
+                    removed += _remove(path)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if self.disk_max_bytes and total > self.disk_max_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.disk_max_bytes:
+                    break
+                if _remove(path):
+                    total -= size
+                    removed += 1
+        with self._lock:
+            self._stats["disk_removed"] += removed
+            self._stats["disk_bytes"] = total
+        if removed:
+            print(f"@cache {self.name} disk sweep: removed {removed} files, {total} bytes left")
+        return removed
+
+    def _maybe_sweep(self):
+        # sweep_interval 마다 background thread 에서 정리 (요청은 기다리지 않음)
+        now = time.monotonic()
+        with self._lock:
+            if self._sweeping or (self._last_sweep is not None and now - self._last_sweep < self.sweep_interval):
+                return
+            self._sweeping, self._last_sweep = True, now
+        threading.Thread(target=self._sweep_background, name=f"bp-cache-sweep-{self.name}", daemon=True).start()
+
+    def _sweep_background(self):
+        try:
+            self.sweep()
+        except OSError as error:
+            print(f"@cache {self.name} disk sweep failed:", error)
+        finally:
+            with self._lock:
+                self._sweeping = False
+
+    def get_or_compute(self, key, compute):
+        # 실패한 결과(None)는 캐시하지 않음
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 단계별 캐시 - 부분 결과도 재사용할 수 있도록 분리
+response_cache = ResultCache("response")
+ocr_cache = ResultCache("ocr")
+kt_cache = ResultCache("kt")
+detection_cache = ResultCache("detection")
+
+
+def cache_stats():
+    return {cache.name: cache.stats() for cache in (response_cache, ocr_cache, kt_cache, detection_cache)}
@@ -0,0 +1,145 @@
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from config import env_setting
+from metrics import Counter
+
+# 요청 결과를 background thread 에서 JSONL 로 모아서 기록 (요청 스레드는 파일 I/O 를 기다리지 않음)
+#   BP_RESULT_LOG_DIR         : 로그 폴더 (프로세스별로 results-<pid>.jsonl 에 기록)
+#   BP_RESULT_LOG_MAX_QUEUE   : 대기 가능한 최대 기록 수 (넘치면 버리고 count)
+#   BP_RESULT_LOG_BATCH       : 한 번에 쓰는 최대 기록 수
+#   BP_RESULT_LOG_FLUSH_SEC   : 최대 flush 간격
+#   BP_RESULT_LOG_MAX_BYTES   : 이 크기를 넘으면 gzip 으로 압축하여 교체
+#   BP_RESULT_LOG_BACKUPS     : 보관할 압축 파일 수
+RESULT_LOG_DIR = env_setting("BP_RESULT_LOG_DIR", "../result_logs")
+RESULT_LOG_MAX_QUEUE = env_setting("BP_RESULT_LOG_MAX_QUEUE", 10000)
+RESULT_LOG_BATCH = env_setting("BP_RESULT_LOG_BATCH", 256)
+RESULT_LOG_FLUSH_SEC = env_setting("BP_RESULT_LOG_FLUSH_SEC", 1.0)
+RESULT_LOG_MAX_BYTES = env_setting("BP_RESULT_LOG_MAX_BYTES", 64 * 1024 * 1024)
+RESULT_LOG_BACKUPS = env_setting("BP_RESULT_LOG_BACKUPS", 20)
+
+result_log_records_total = Counter("bp_result_log_records_total", "Result log records by outcome", ("outcome",))
+
+_STOP = object()
+
+
+class ResultLogWriter:
+    def __init__(self, directory=RESULT_LOG_DIR, max_queue=RESULT_LOG_MAX_QUEUE, batch_size=RESULT_LOG_BATCH,
+                 flush_interval=RESULT_LOG_FLUSH_SEC, max_bytes=RESULT_LOG_MAX_BYTES, backups=RESULT_LOG_BACKUPS):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._file = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"results-{os.getpid()}.jsonl")
+
+    def start(self):
+        # fork 된 worker 에서는 thread 가 없으므로 처음 submit 할 때 다시 시작
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._file = None
+            self._thread = threading.Thread(target=self._run, name="bp-result-log", daemon=True)
+            self._thread.start()
+
+    def submit(self, record):
+        # 요청 스레드에서 호출 - 대기 없이 queue 에 넣기만 함
+        if self._thread is None or self._pid != os.getpid():
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            result_log_records_total.inc(outcome="dropped")
+            return False
+
+    def close(self, timeout=10.0):
+        # 종료 시 남은 기록을 모두 flush
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if batch and (stopping or len(batch) >= self.batch_size
+                          or time.monotonic() - last_flush >= self.flush_interval):
+                self._write(batch)
+                batch = []
+            if not batch:
+                last_flush = time.monotonic()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False))
+            except (TypeError, ValueError) as error:
+                print("@result-log skip record:", error)
+                result_log_records_total.inc(outcome="invalid")
+        try:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            result_log_records_total.inc(len(lines), outcome="written")
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as error:
+            print("@result-log write failed:", error)
+            result_log_records_total.inc(len(lines), outcome="failed")
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        current = self.path
+        rotated = current.replace(".jsonl", time.strftime("-%Y%m%d-%H%M%S") + ".jsonl.gz")
+        with open(current, "rb") as source, gzip.open(rotated, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(current)
+        backups = sorted(glob.glob(os.path.join(self.directory, "results-*.jsonl.gz")), key=os.path.getmtime)
+        for path in backups[:max(0, len(backups) - self.backups)]:
+            os.remove(path)
+
+
+result_log = ResultLogWriter()
+atexit.register(result_log.close)
@@ -0,0 +1,72 @@
+import copy
+import threading
+from config import env_setting
+from metrics import Counter, Gauge
+from resilience import DeadlineExceeded
+
+# 같은 이미지가 동시에 여러 번 들어온 경우 (느린 네트워크에서 앱이 재시도) 한 번만 계산
+#   - 처음 들어온 요청(leader)이 OCR / KT / 모델 추론을 실행하고, 같은 key 로 들어온 요청은 그 결과를 기다려서 함께 사용
+#   - leader 에서 예외가 나면 기다리던 모든 요청에 같은 예외 전달
+#   - 기다리는 요청은 자기 deadline 까지만 대기 (넘으면 DeadlineExceeded)
+#   - 결과 캐시(result_cache)는 끝난 결과만 재사용하므로, 계산 중인 요청은 여기서 합침
+#
+#   BP_COALESCE : 1 이면 사용
+COALESCE = env_setting("BP_COALESCE", True)
+
+coalesced_total = Counter("bp_coalesced_total", "Requests that waited for an identical in-flight request",
+                          ("name", "result"))
+inflight_calls = Gauge("bp_singleflight_inflight", "In-flight coalescable computations", ("name",))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        inflight_calls.set(0, name=name)
+
+    def do(self, key, compute, deadline=None):
+        # (결과, shared) 반환 - shared 가 True 이면 다른 요청의 계산 결과 (요청마다 복사본)
+        if not COALESCE:
+            return compute(), False
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                inflight_calls.set(len(self._calls), name=self.name)
+            else:
+                call.waiters += 1
+        if leader:
+            try:
+                call.value = compute()
+                return call.value, False
+            except BaseException as error:
+                call.error = error
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    inflight_calls.set(len(self._calls), name=self.name)
+                call.done.set()
+
+        if not call.done.wait(deadline.remaining() if deadline is not None else None):
+            coalesced_total.inc(name=self.name, result="timeout")
+            raise DeadlineExceeded(f"{self.name}: deadline exceeded while waiting for an in-flight request")
+        if call.error is not None:
+            coalesced_total.inc(name=self.name, result="error")
+            raise call.error
+        coalesced_total.inc(name=self.name, result="ok")
+        return copy.deepcopy(call.value), True
+
+    def stats(self):
+        with self._lock:
+            return {"inflight": len(self._calls), "waiters": sum(call.waiters for call in self._calls.values())}
@@ -0,0 +1,125 @@
+import io
+import os
+import threading
+import time
+import numpy as np
+from PIL import Image
+from config import env_setting
+from metrics import timed
+from model_registry import load_models
+
+# 서버 시작 순서
+#   1. model_api import (torch / ultralytics 는 아직 import 하지 않음 -> /healthz 바로 응답)
+#   2. background thread 에서 모델 로드 (여기서 처음 ultralytics import)
+#   3. 각 모델을 더미 이미지로 warmup (첫 요청이 커널 초기화 비용을 내지 않도록)
+#   4. 이미지 디코딩 / WBF 경로 warmup 후 ready -> /readyz 200
+#
+#   BP_BACKGROUND_STARTUP : 1 이면 import 후 바로 요청을 받고 background 에서 로드 (0 이면 import 중에 완료)
+#   BP_WARMUP_SIZES       : warmup 에 사용할 입력 크기 (가로x세로, 콤마 구분) - 세로 / 가로 / 정사각형 사진
+#   BP_WARMUP_RUNS        : 크기별 warmup 추론 횟수
+#   BP_READY_WAIT_SEC     : 준비 전에 들어온 /predict 가 기다리는 최대 시간 (넘으면 503)
+BACKGROUND_STARTUP = env_setting("BP_BACKGROUND_STARTUP", True)
+WARMUP_SIZES = env_setting("BP_WARMUP_SIZES", "1080x1440,1440x1080,1080x1080")
+WARMUP_RUNS = env_setting("BP_WARMUP_RUNS", 2)
+READY_WAIT_SEC = env_setting("BP_READY_WAIT_SEC", 60.0)
+
+
+def _warmup_sizes(spec=WARMUP_SIZES):
+    sizes = []
+    for item in spec.split(","):
+        if item.strip():
+            width, height = item.lower().split("x")
+            sizes.append((int(width), int(height)))
+    return sizes
+
+
+class Startup:
+    # 모델 로드 / warmup 진행 상태 (phase: starting -> loading -> warming -> ready | failed)
+    def __init__(self, weights, model_list, warmup=None):
+        self.weights = weights
+        self.model_list = model_list
+        self.warmup = warmup
+        self.phase = "starting"
+        self.error = None
+        self.started_at = time.time()
+        self.timings = {}
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    @property
+    def failed(self):
+        return self.phase == "failed"
+
+    def start(self, background=BACKGROUND_STARTUP):
+        if background:
+            self._thread = threading.Thread(target=self.run, name="bp-startup", daemon=True)
+            self._thread.start()
+        else:
+            self.run()
+        return self
+
+    def wait(self, timeout=READY_WAIT_SEC):
+        # 준비가 끝나면 True, 실패했거나 timeout 이면 False
+        self._done.wait(timeout)
+        return self.ready
+
+    def run(self):
+        try:
+            self.phase = "loading"
+            start = time.perf_counter()
+            # 다른 모듈이 같은 list 객체를 참조하므로 내용만 교체
+            self.model_list[:] = load_models(self.weights)
+            self.timings["load_sec"] = round(time.perf_counter() - start, 3)
+
+            self.phase = "warming"
+            for model in self.model_list:
+                start = time.perf_counter()
+                warmup_model(model)
+                self.timings[f"warmup_sec:{model.weight}"] = round(time.perf_counter() - start, 3)
+            if self.warmup is not None:
+                start = time.perf_counter()
+                self.warmup()
+                self.timings["warmup_sec:pipeline"] = round(time.perf_counter() - start, 3)
+
+            self.phase = "ready"
+            self.timings["startup_sec"] = round(time.time() - self.started_at, 3)
+            self._ready.set()
+            print("@startup ready", self.timings)
+        except Exception as error:
+            self.phase = "failed"
+            self.error = f"{type(error).__name__}: {error}"
+            print("@startup failed:", self.error)
+        finally:
+            self._done.set()
+
+    def status(self):
+        return {
+            "phase": self.phase,
+            "ready": self.ready,
+            "error": self.error,
+            "uptime_sec": round(time.time() - self.started_at, 3),
+            "models": [model.weight for model in self.model_list],
+            "timings": dict(self.timings),
+        }
+
+
+def warmup_model(model, sizes=None, runs=WARMUP_RUNS):
+    # 실제 요청과 같은 크기 / 형식(BGR uint8)의 더미 이미지로 추론하여 letterbox 크기별 초기화를 미리 수행
+    rng = np.random.default_rng(0)
+    for width, height in sizes or _warmup_sizes():
+        array = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(runs):
+            with timed("warmup", model=os.path.basename(model.weight)):
+                model.predict(array)
+
+
+def warmup_jpeg(size=(1080, 1440)):
+    # 디코딩 / 리사이즈 / 인코딩 경로 warmup 용 JPEG
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (128, 128, 128)).save(buffer, format="JPEG")
+    return buffer.getvalue()
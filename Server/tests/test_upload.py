@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+
+import pytest
+
+# ultralytics 를 upload 보다 먼저 import (Image.open 이 pi-heif 로딩 함수로 바뀐 상태) 해도
+# 이미지가 아닌 업로드는 4xx 로 거절되어야 함
+import ultralytics  # noqa: F401
+from ultralytics.utils import checks, patches
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from PIL import Image  # noqa: E402
+from upload import UploadError, probe_image  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_requirement_install(monkeypatch):
+    # header 확인 중에 pi-heif 설치를 시도하면 실패
+    def fail(*args, **kwargs):
+        raise AssertionError("check_requirements called while probing an upload")
+    monkeypatch.setattr(checks, "check_requirements", fail)
+
+
+def jpeg_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 100, 50)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_image_open_is_patched():
+    assert Image.open.__module__ == "ultralytics.utils.patches"
+
+
+def test_valid_jpeg():
+    assert probe_image(io.BytesIO(jpeg_bytes())) == ("JPEG", 64, 48)
+
+
+@pytest.mark.parametrize("data", [b"not an image at all", b"<html></html>" * 100], ids=["text", "html"])
+def test_non_image_is_415(data):
+    with pytest.raises(UploadError) as error:
+        probe_image(io.BytesIO(data))
+    assert error.value.status == 415
+
+
+def test_truncated_header_is_rejected():
+    with pytest.raises(UploadError) as error:
+        probe_image(io.BytesIO(jpeg_bytes()[:20]))
+    assert error.value.status in (400, 415)
+
+
+def test_small_image_is_422():
+    with pytest.raises(UploadError) as error:
+        probe_image(io.BytesIO(jpeg_bytes((16, 16))))
+    assert error.value.status == 422
+
+
+def test_fallback_when_original_open_is_missing(monkeypatch):
+    # ultralytics 내부 이름(_image_open)이 바뀌어도 정상 이미지는 통과, 이미지가 아니면 415
+    monkeypatch.delattr(patches, "_image_open")
+    assert probe_image(io.BytesIO(jpeg_bytes())) == ("JPEG", 64, 48)
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 40)).save(buffer, format="PNG")
+    assert probe_image(buffer) == ("PNG", 40, 40)
+    with pytest.raises(UploadError) as error:
+        probe_image(io.BytesIO(b"<html></html>" * 100))
+    assert error.value.status == 415
+    with pytest.raises(UploadError) as error:
+        probe_image(io.BytesIO(b"GIF89a" + b"\0" * 100))
+    assert error.value.status == 415
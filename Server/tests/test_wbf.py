@@ -0,0 +1,53 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+# wbf.py 는 ensemble_boxes.weighted_boxes_fusion 과 같은 결과를 내야 함 (무작위 입력으로 비교)
+ensemble_boxes = pytest.importorskip("ensemble_boxes")
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from wbf import weighted_boxes_fusion  # noqa: E402
+
+CASES = 200
+
+
+def random_case(rng):
+    # 모델 1 ~ 4 개, 모델별 박스 0 ~ 12 개 (범위 밖 좌표 / 면적 0 박스 포함), 라벨 0 ~ 3
+    boxes_list, scores_list, labels_list = [], [], []
+    for _ in range(rng.integers(1, 5)):
+        count = rng.integers(0, 13)
+        corners = rng.uniform(-0.05, 1.05, size=(count, 2, 2))
+        boxes = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+        flat = rng.random(count) < 0.1
+        boxes[flat, 2] = boxes[flat, 0]
+        boxes_list.append(boxes.tolist())
+        scores_list.append(rng.uniform(0, 1, size=count).tolist())
+        labels_list.append(rng.integers(0, 4, size=count).tolist())
+    weights = rng.uniform(0.5, 2, size=len(boxes_list)).tolist() if rng.random() < 0.5 else None
+    iou_thr = float(rng.choice([0.3, 0.55, 0.7]))
+    skip_box_thr = float(rng.choice([0.0, 0.2, 0.4]))
+    return boxes_list, scores_list, labels_list, weights, iou_thr, skip_box_thr
+
+
+@pytest.mark.parametrize("conf_type", ["avg", "max"])
+@pytest.mark.parametrize("seed", range(CASES))
+def test_matches_ensemble_boxes(seed, conf_type):
+    boxes_list, scores_list, labels_list, weights, iou_thr, skip_box_thr = random_case(np.random.default_rng(seed))
+    with warnings.catch_warnings():
+        # ensemble_boxes 는 범위 밖 좌표 / 면적 0 박스마다 경고
+        warnings.simplefilter("ignore")
+        expected = ensemble_boxes.weighted_boxes_fusion(
+            boxes_list, scores_list, labels_list, weights=weights, iou_thr=iou_thr, skip_box_thr=skip_box_thr,
+            conf_type=conf_type
+        )
+    actual = weighted_boxes_fusion(
+        boxes_list, scores_list, labels_list, weights=weights, iou_thr=iou_thr, skip_box_thr=skip_box_thr,
+        conf_type=conf_type
+    )
+    for expected_array, actual_array in zip(expected, actual):
+        np.testing.assert_allclose(actual_array, expected_array, rtol=0, atol=1e-9)
@@ -0,0 +1,117 @@
+import os
+import struct
+import sys
+from tempfile import SpooledTemporaryFile
+from flask import Request
+from PIL import Image, UnidentifiedImageError
+from config import env_setting
+
+# 업로드 이미지 수신 / 검증
+#   BP_MAX_REQUEST_BYTES  : 요청 전체 최대 크기 (Content-Length 가 넘으면 body 를 읽기 전에 413) - /predict/batch 에 적용
+#   BP_MAX_IMAGE_BYTES    : 이미지 파일 하나의 최대 크기
+#   BP_FORM_OVERHEAD_BYTES: /predict 요청 크기 제한 = 이미지 하나 최대 크기 + 이 값 (multipart header / form 필드)
+#   BP_MAX_IMAGE_PIXELS   : 이미지 하나의 최대 픽셀 수 (가로 x 세로, 디코딩 전에 header 로 확인)
+#   BP_MIN_IMAGE_SIDE     : 가로 / 세로 최소 길이
+#   BP_UPLOAD_SPOOL_BYTES : 이 크기까지는 메모리, 넘으면 임시 파일에 저장
+#   BP_IMAGE_FORMATS      : 허용하는 이미지 형식 (PIL format 이름, 콤마 구분)
+MAX_REQUEST_BYTES = env_setting("BP_MAX_REQUEST_BYTES", 200 * 1024 * 1024)
+MAX_IMAGE_BYTES = env_setting("BP_MAX_IMAGE_BYTES", 20 * 1024 * 1024)
+FORM_OVERHEAD_BYTES = env_setting("BP_FORM_OVERHEAD_BYTES", 64 * 1024)
+MAX_PREDICT_BYTES = MAX_IMAGE_BYTES + FORM_OVERHEAD_BYTES
+MAX_IMAGE_PIXELS = env_setting("BP_MAX_IMAGE_PIXELS", 50_000_000)
+MIN_IMAGE_SIDE = env_setting("BP_MIN_IMAGE_SIDE", 32)
+UPLOAD_SPOOL_BYTES = env_setting("BP_UPLOAD_SPOOL_BYTES", 1024 * 1024)
+IMAGE_FORMATS = tuple(fmt.strip().upper() for fmt in env_setting("BP_IMAGE_FORMATS", "JPEG,MPO,PNG,WEBP").split(",")
+                      if fmt.strip())
+
+# 전체 디코딩 시에도 decompression bomb 방지 (PIL 은 이 값의 2 배를 넘으면 예외)
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+def _open_header(fp):
+    # 허용 형식의 PIL plugin 만으로 header 확인 (PIL Image.open 과 같은 방식, 다른 형식 / pi-heif 로딩 없음)
+    Image.init()
+    prefix = fp.read(16)
+    for fmt in IMAGE_FORMATS:
+        if fmt not in Image.OPEN:
+            continue
+        factory, accept = Image.OPEN[fmt]
+        accepted = accept is None or accept(prefix)
+        # accept 가 문자열이면 PIL 이 지원하지 않는 변형 (경고 메시지)
+        if not accepted or isinstance(accepted, str):
+            continue
+        fp.seek(0)
+        try:
+            return factory(fp, "")
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+    raise UnidentifiedImageError("cannot identify image file")
+
+
+def _pil_open():
+    # ultralytics 는 import 시 Image.open 을 바꿔서 열기에 실패하면 pi-heif 설치를 시도하므로
+    # import 순서와 상관없이 바꾸기 전의 PIL 함수로 header 확인
+    # (ultralytics 내부 이름이 바뀌어 원래 함수를 찾지 못하면 _open_header 사용)
+    open_image = Image.open
+    if open_image.__module__ == "ultralytics.utils.patches":
+        open_image = getattr(sys.modules[open_image.__module__], "_image_open", None) or _open_header
+    return open_image
+
+
+class UploadError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class UploadRequest(Request):
+    # multipart 파일을 UPLOAD_SPOOL_BYTES 까지만 메모리에 두고 나머지는 임시 파일로 저장
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode="rb+")
+
+
+def _stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def probe_image(stream):
+    # header 만 읽어서 형식 / 크기 확인 (픽셀 데이터는 디코딩하지 않음)
+    open_image = _pil_open()
+    stream.seek(0)
+    try:
+        with open_image(stream) as img:
+            fmt, (width, height) = img.format, img.size
+    except UnidentifiedImageError:
+        raise UploadError(415, "not an image file")
+    except Image.DecompressionBombError as error:
+        raise UploadError(413, str(error))
+    except Exception as error:
+        # header 를 읽다가 난 오류는 모두 잘못된 업로드로 처리 (500 이 되지 않도록)
+        raise UploadError(400, f"broken image header: {type(error).__name__}: {error}")
+    finally:
+        stream.seek(0)
+    if fmt not in IMAGE_FORMATS:
+        raise UploadError(415, f"unsupported image format: {fmt} (allowed: {', '.join(IMAGE_FORMATS)})")
+    if width * height > MAX_IMAGE_PIXELS:
+        raise UploadError(413, f"image too large: {width}x{height} (max {MAX_IMAGE_PIXELS} pixels)")
+    if min(width, height) < MIN_IMAGE_SIDE:
+        raise UploadError(422, f"image too small: {width}x{height} (min side {MIN_IMAGE_SIDE})")
+    return fmt, width, height
+
+
+def read_upload(file, max_bytes=MAX_IMAGE_BYTES):
+    # 크기 / header 검증을 통과한 업로드만 bytes 로 읽음
+    if file is None:
+        raise UploadError(400, "food_image is required")
+    size = _stream_size(file.stream)
+    if size == 0:
+        raise UploadError(400, "empty file")
+    if size > max_bytes:
+        raise UploadError(413, f"file too large: {size} bytes (max {max_bytes})")
+    probe_image(file.stream)
+    return file.stream.read()
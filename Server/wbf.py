@@ -0,0 +1,144 @@
+import numpy as np
+
+# ensemble_boxes.weighted_boxes_fusion 과 같은 결과를 내는 numpy 구현
+# - 박스 전처리(clip / 면적 0 제거 / 라벨별 정렬)를 배열 단위로 처리
+# - 클러스터 좌표 합계를 누적해 두어 박스가 합쳐질 때마다 클러스터 전체를 다시 계산하지 않음
+# - 클러스터 배열을 미리 할당하여 np.vstack 반복을 피함
+# conf_type 은 서버에서 사용하는 'avg', 'max' 만 지원
+
+
+def _as_array(values, width):
+    array = np.asarray(values, dtype=np.float64)
+    return array.reshape(-1, width) if width else array.reshape(-1)
+
+
+def prefilter_boxes(boxes_list, scores_list, labels_list, weights, thr):
+    # [label, score * weight, weight, model index, x1, y1, x2, y2] 행을 라벨별로 모아 score 내림차순 정렬
+    rows = []
+    for t, (boxes, scores, labels) in enumerate(zip(boxes_list, scores_list, labels_list)):
+        boxes = _as_array(boxes, 4)
+        scores = _as_array(scores, 0)
+        labels = _as_array(labels, 0)
+        if not (len(boxes) == len(scores) == len(labels)):
+            raise ValueError(
+                f"Length of boxes, scores and labels do not match for model {t}: "
+                f"{len(boxes)}, {len(scores)}, {len(labels)}"
+            )
+        keep = scores >= thr
+        if not keep.any():
+            continue
+        boxes, scores, labels = boxes[keep], scores[keep], labels[keep].astype(np.int64)
+
+        x1 = np.minimum(boxes[:, 0], boxes[:, 2])
+        x2 = np.maximum(boxes[:, 0], boxes[:, 2])
+        y1 = np.minimum(boxes[:, 1], boxes[:, 3])
+        y2 = np.maximum(boxes[:, 1], boxes[:, 3])
+        coords = np.clip(np.stack([x1, y1, x2, y2], axis=1), 0, 1)
+        area = (coords[:, 2] - coords[:, 0]) * (coords[:, 3] - coords[:, 1])
+        keep = area != 0.0
+
+        model_rows = np.empty((int(keep.sum()), 8), dtype=np.float64)
+        model_rows[:, 0] = labels[keep]
+        model_rows[:, 1] = scores[keep] * weights[t]
+        model_rows[:, 2] = weights[t]
+        model_rows[:, 3] = t
+        model_rows[:, 4:] = coords[keep]
+        rows.append(model_rows)
+
+    filtered = {}
+    if not rows:
+        return filtered
+    rows = np.concatenate(rows, axis=0)
+    # 라벨은 처음 등장한 순서대로 처리 (ensemble_boxes 와 동일)
+    _, first_index = np.unique(rows[:, 0], return_index=True)
+    for label in rows[np.sort(first_index), 0]:
+        label_rows = rows[rows[:, 0] == label]
+        filtered[int(label)] = label_rows[label_rows[:, 1].argsort()[::-1]]
+    return filtered
+
+
+def _iou(clusters, box):
+    xA = np.maximum(clusters[:, 0], box[0])
+    yA = np.maximum(clusters[:, 1], box[1])
+    xB = np.minimum(clusters[:, 2], box[2])
+    yB = np.minimum(clusters[:, 3], box[3])
+    inter_area = np.maximum(xB - xA, 0) * np.maximum(yB - yA, 0)
+    clusters_area = (clusters[:, 2] - clusters[:, 0]) * (clusters[:, 3] - clusters[:, 1])
+    box_area = (box[2] - box[0]) * (box[3] - box[1])
+    return inter_area / (clusters_area + box_area - inter_area)
+
+
+def _fuse_label(boxes, iou_thr, conf_type):
+    n = len(boxes)
+    weighted = np.empty((n, 8), dtype=np.float64)
+    # 클러스터별 누적값 - ensemble_boxes 와 같이 좌표 합은 float32 로 누적
+    coord_sums = np.zeros((n, 4), dtype=np.float32)
+    conf_sums = np.zeros(n, dtype=np.float64)
+    conf_max = np.zeros(n, dtype=np.float64)
+    weight_sums = np.zeros(n, dtype=np.float64)
+    counts = np.zeros(n, dtype=np.int64)
+    size = 0
+
+    for box in boxes:
+        index = -1
+        if size:
+            ious = _iou(weighted[:size, 4:], box[4:])
+            best = int(np.argmax(ious))
+            if ious[best] > iou_thr:
+                index = best
+
+        if index == -1:
+            weighted[size] = box
+            index = size
+            size += 1
+        else:
+            merged = weighted[index]
+            merged[0] = box[0]
+            merged[3] = -1
+
+        coord_sums[index] += box[1] * box[4:]
+        conf_sums[index] += box[1]
+        conf_max[index] = max(conf_max[index], box[1])
+        weight_sums[index] += box[2]
+        counts[index] += 1
+
+        if counts[index] > 1:
+            coords = coord_sums[index].copy()
+            coords /= conf_sums[index]
+            weighted[index, 4:] = coords
+            if conf_type == "max":
+                weighted[index, 1] = np.float32(conf_max[index])
+            else:
+                weighted[index, 1] = np.float32(conf_sums[index] / counts[index])
+            weighted[index, 2] = np.float32(weight_sums[index])
+
+    return weighted[:size], counts[:size]
+
+
+def weighted_boxes_fusion(boxes_list, scores_list, labels_list, weights=None, iou_thr=0.55,
+                          skip_box_thr=0.0, conf_type="avg", allows_overflow=False):
+    if conf_type not in ("avg", "max"):
+        raise ValueError(f"Unsupported conf_type: {conf_type}. Must be 'avg' or 'max'")
+    if weights is None or len(weights) != len(boxes_list):
+        weights = np.ones(len(boxes_list))
+    weights = np.asarray(weights, dtype=np.float64)
+
+    filtered_boxes = prefilter_boxes(boxes_list, scores_list, labels_list, weights, skip_box_thr)
+    if not filtered_boxes:
+        return np.zeros((0, 4)), np.zeros((0,)), np.zeros((0,))
+
+    overall_boxes = []
+    for boxes in filtered_boxes.values():
+        weighted, counts = _fuse_label(boxes, iou_thr, conf_type)
+        # 모델 수 / 박스 수에 따라 confidence 재조정
+        if conf_type == "max":
+            weighted[:, 1] = weighted[:, 1] / weights.max()
+        elif not allows_overflow:
+            weighted[:, 1] = weighted[:, 1] * np.minimum(len(weights), counts) / weights.sum()
+        else:
+            weighted[:, 1] = weighted[:, 1] * counts / weights.sum()
+        overall_boxes.append(weighted)
+
+    overall_boxes = np.concatenate(overall_boxes, axis=0)
+    overall_boxes = overall_boxes[overall_boxes[:, 1].argsort()[::-1]]
+    return overall_boxes[:, 4:], overall_boxes[:, 1], overall_boxes[:, 0]